@@ -5,31 +5,151 @@ Centralizes all configuration settings and environment variables.
 
 import os
 from functools import lru_cache
-from dotenv import load_dotenv
+from typing import Optional
 
-load_dotenv()
+from pydantic import Field, model_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
-class Settings:
-    """Application settings loaded from environment variables."""
-    
+class Settings(BaseSettings):
+    """Application settings loaded from environment variables (and .env)."""
+
+    model_config = SettingsConfigDict(env_file=".env", frozen=True, extra="ignore")
+
     # API Keys
-    GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
-    
+    GEMINI_API_KEY: str = ""
+
     # CORS Settings
     CORS_ORIGINS: list[str] = ["*"]  # Em produção, especifique os domínios permitidos
-    
-    # Logging
-    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "DEBUG")
-    
+
+    # Logging (DEBUG also logs every TTS chunk)
+    LOG_LEVEL: str = "INFO"
+
     # App Info
     APP_TITLE: str = "Podcast Generator API"
     APP_DESCRIPTION: str = "API para geração de podcasts usando LLM para criar scripts e TTS para gerar áudio"
     APP_VERSION: str = "1.0.0"
-    
+
     # LLM Models
-    LLM_MODEL: str = os.getenv("LLM_MODEL", "gemini-2.5-flash")
-    TTS_MODEL: str = os.getenv("TTS_MODEL", "gemini-2.5-pro-preview-tts")
+    LLM_MODEL: str = "gemini-2.5-flash"
+    TTS_MODEL: str = "gemini-2.5-pro-preview-tts"
+
+    # Audio output: "opus" (Ogg, ~24 kbps), "flac" (lossless) or "wav";
+    # clients can override it per request with ?format=
+    AUDIO_FORMAT: str = "opus"
+    AUDIO_OPUS_BITRATE: int = 24000
+
+    # TTS segmentation: scripts longer than this are split into whole speaker
+    # turns synthesized in parallel (0 = one request per script)
+    TTS_SEGMENT_CHARS: int = 0
+    TTS_MAX_PARALLEL_SEGMENTS: int = 4
+
+    # Gemini HTTP client (shared by all services)
+    GEMINI_TIMEOUT_SECONDS: int = 300
+    GEMINI_MAX_CONNECTIONS: int = 100
+    GEMINI_MAX_KEEPALIVE_CONNECTIONS: int = 50
+    GEMINI_RETRY_ATTEMPTS: int = 3  # including the first call; 1 disables retries
+    LLM_MAX_CONCURRENCY: int = 16  # concurrent script/enhance calls per process
+
+    # LLM response cache (exact match, per process); TTL 0 disables it
+    LLM_CACHE_TTL_SECONDS: int = 86400
+    LLM_CACHE_MAXSIZE: int = 1024
+    # Gemini samples scripts non-deterministically: disable to get a fresh
+    # script for every request, even with identical parameters
+    CACHE_SCRIPTS: bool = True
+    # Explicit Gemini context cache for the static script instructions
+    # (billed storage per hour; 0 keeps relying on implicit prefix caching).
+    # The current prompt is under Gemini's minimum cacheable size, so this is
+    # disabled at the first request with a log line until the prompt grows
+    SCRIPT_CONTEXT_CACHE_TTL_SECONDS: int = 0
+    # Explicit Gemini context cache for large uploaded documents, reused by
+    # requests over the same files (billed storage per hour; 0 disables it)
+    DOCUMENT_CONTEXT_CACHE_TTL_SECONDS: int = 0
+
+    # Document processing (parallel Docling conversions per process)
+    DOCUMENT_WORKERS: int = Field(default_factory=lambda: min(4, os.cpu_count() or 1))
+    DOCUMENT_CACHE_DIR: str = "/tmp/docling_cache"  # empty disables the cache
+    # Pre-downloaded Docling models (scripts/download_models.py); empty lets
+    # Docling fetch them from Hugging Face on first use
+    DOCUMENT_ARTIFACTS_PATH: str = ""
+    # Read DOCX/XLSX/PPTX text from their XML instead of running Docling
+    DOCUMENT_OOXML_FAST_PATH: bool = True
+    # Run Docling's table structure model on PDFs. Slow, but when off the
+    # contents of PDF tables are left out of the extracted text
+    DOCUMENT_TABLE_STRUCTURE: bool = False
+    # Uploads larger than this are rejected with 413 before any conversion
+    DOCUMENT_MAX_UPLOAD_BYTES: int = 10 * 1024 * 1024
+
+    # GCP Storage
+    BUCKET_AUDIOS: str = ""
+    # Resumable upload chunk (multiple of 256 KiB), used above 8 MiB
+    GCS_UPLOAD_CHUNK_SIZE: int = 8 * 1024 * 1024
+    # In-memory uploads this large are sent as parallel parts (XML multipart API);
+    # GCS_UPLOAD_MAX_WORKERS <= 1 disables it
+    GCS_PARALLEL_UPLOAD_THRESHOLD: int = 8 * 1024 * 1024
+    GCS_UPLOAD_MAX_WORKERS: int = 8
+
+    # Database connection
+    DB_HOST: str = "localhost"
+    DB_PORT: int = 5432
+    DB_NAME: str = "podcast"
+    DB_USER: str = "postgres"
+    DB_PASSWORD: str = ""
+    DB_SSLMODE: str = "prefer"
+    DB_ECHO: bool = False
+    DB_APPLICATION_NAME: str = "podcast-api"
+    DB_COMMAND_TIMEOUT: float = 30
+    DB_DISABLE_JIT: bool = True
+
+    # Database pool
+    DB_POOL_SIZE: int = 20  # derived from DB_MAX_CONNECTIONS when unset
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 60
+    DB_POOL_PRE_PING: bool = False
+    DB_MAX_CONNECTIONS: Optional[int] = None
+    # Uvicorn workers started by main.py; also divides the DB connection budget
+    WEB_CONCURRENCY: int = 1
+
+    # Server port for main.py (the Dockerfile CMD reads the PORT env var)
+    PORT: int = 8000
+
+    # Startup
+    RUN_DDL_ON_STARTUP: bool = False
+    # Load Docling models and open the Gemini connection before /health/ready
+    WARMUP_ON_STARTUP: bool = True
+    # Threads behind asyncio.to_thread (GCS, signing, sync SDK calls); these
+    # mostly wait on sockets, so the pool is sized well above the CPU count
+    THREADPOOL_WORKERS: int = 32
+
+    @model_validator(mode="before")
+    @classmethod
+    def _default_pool_size(cls, data):
+        """
+        Default pool size per worker: min(async concurrency, db max connections / workers).
+
+        Falls back to 20 when DB_MAX_CONNECTIONS is not known.
+        """
+        if isinstance(data, dict) and data.get("DB_POOL_SIZE") is None:
+            pool_size = 20
+            max_connections = data.get("DB_MAX_CONNECTIONS")
+            if max_connections:
+                workers = max(1, int(data.get("WEB_CONCURRENCY") or 1))
+                pool_size = max(1, min(pool_size, int(max_connections) // workers))
+            data = {**data, "DB_POOL_SIZE": pool_size}
+        return data
+
+    @property
+    def database_url(self) -> str:
+        """PostgreSQL connection URL for asyncpg (postgresql+asyncpg:// scheme)."""
+        url = (
+            f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}"
+            f"@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+        )
+        # Add SSL mode if required
+        if self.DB_SSLMODE == "require":
+            url += "?ssl=require"
+        return url
 
 
 @lru_cache()
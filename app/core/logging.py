@@ -5,15 +5,20 @@ Logging configuration for the Podcast Generator API.
 import logging
 from app.core.config import settings
 
+_NOISY_LOGGERS = ("google", "google_genai", "httpx", "httpcore", "urllib3")
+
 
 def setup_logging() -> logging.Logger:
     """
     Configures and returns the application logger.
     """
     logging.basicConfig(
-        level=getattr(logging, settings.LOG_LEVEL.upper(), logging.DEBUG),
+        level=getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO),
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
+    # Client libraries log every request/connection at DEBUG/INFO
+    for name in _NOISY_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
     return logging.getLogger(__name__)
 
 
@@ -3,10 +3,13 @@ Database connection and session management.
 Uses SQLAlchemy with asyncpg for async PostgreSQL operations.
 """
 
-import os
 import logging
+from typing import AsyncGenerator
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -16,38 +19,40 @@ class Base(DeclarativeBase):
     pass
 
 
-# Build database URL from environment variables
-def get_database_url() -> str:
-    """Build PostgreSQL connection URL from environment variables."""
-    host = os.getenv("DB_HOST", "localhost")
-    port = os.getenv("DB_PORT", "5432")
-    name = os.getenv("DB_NAME", "podcast")
-    user = os.getenv("DB_USER", "postgres")
-    password = os.getenv("DB_PASSWORD", "")
-    sslmode = os.getenv("DB_SSLMODE", "prefer")
-    
-    # asyncpg uses postgresql+asyncpg:// scheme
-    url = f"postgresql+asyncpg://{user}:{password}@{host}:{port}/{name}"
-    
-    # Add SSL mode if required
-    if sslmode == "require":
-        url += "?ssl=require"
+def _server_settings() -> dict[str, str]:
+    """
+    Session parameters sent by asyncpg on every new connection.
     
-    return url
+    JIT never pays back for this OLTP workload, so it is turned off by default.
+    Poolers that reject unknown startup parameters can set DB_DISABLE_JIT=false.
+    """
+    server_settings = {"application_name": settings.DB_APPLICATION_NAME}
+    if settings.DB_DISABLE_JIT:
+        server_settings["jit"] = "off"
+    return server_settings
 
 
 # Create async engine
-DATABASE_URL = get_database_url()
+DATABASE_URL = settings.database_url
+# pgbouncer (transaction mode) leaves the pre-ping SELECT 1 "idle in transaction",
+# so pre-ping is opt-in for direct Postgres deployments only.
+# LIFO reuse lets surplus idle connections age out via pool_recycle.
 engine = create_async_engine(
     DATABASE_URL,
-    echo=os.getenv("DB_ECHO", "false").lower() == "true",
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
+    echo=settings.DB_ECHO,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_use_lifo=True,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
     # Supabase uses pgbouncer which doesn't support prepared statements
     connect_args={
         "statement_cache_size": 0,
         "prepared_statement_cache_size": 0,
+        "server_settings": _server_settings(),
+        "command_timeout": settings.DB_COMMAND_TIMEOUT,
     },
 )
 
@@ -59,13 +64,11 @@ async_session_maker = async_sessionmaker(
 )
 
 
-async def get_session() -> AsyncSession:
+async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """Get a database session for dependency injection."""
+    # The context manager closes the session on exit
     async with async_session_maker() as session:
-        try:
-            yield session
-        finally:
-            await session.close()
+        yield session
 
 
 async def create_tables():
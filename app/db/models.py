@@ -4,7 +4,7 @@ Database models for the podcast application.
 
 import uuid
 from datetime import datetime
-from sqlalchemy import String, Integer, Text, DateTime, Index
+from sqlalchemy import String, Integer, Text, DateTime, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
@@ -70,10 +70,21 @@ class Podcast(Base):
         nullable=False,
     )
     
-    # Composite index for efficient user queries
+    # Composite index for efficient user queries.
+    # INCLUDE (PG11+) covers every column the list page reads, so it can run as
+    # an index-only scan; existing databases: scripts/sql/podcasts_covering_index.sql
     __table_args__ = (
-        Index("idx_podcasts_user_created", "user_id", "created_at", postgresql_using="btree"),
+        Index(
+            "idx_podcasts_user_created",
+            "user_id",
+            text("created_at DESC"),
+            postgresql_using="btree",
+            postgresql_include=[
+                "id", "title", "theme", "duration_minutes", "audio_url", "audio_path",
+            ],
+        ),
     )
     
     def __repr__(self) -> str:
-        return f"<Podcast(id={self.id}, title='{self.title[:30]}...', user_id='{self.user_id}')>"
+        title_preview = self.title[:30] if self.title else ""
+        return f"<Podcast(id={self.id}, title='{title_preview}...', user_id='{self.user_id}')>"
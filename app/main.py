@@ -5,6 +5,8 @@ This module creates and configures the FastAPI application instance,
 including middleware, routers, and other application-level settings.
 """
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -13,6 +15,46 @@ from app.core.config import settings
 from app.core.logging import logger
 from app.routers import health, enhance, podcast, voices
 from app.db.database import create_tables, close_database
+from app.services.document_service import document_service
+from app.services.tts_service import tts_service
+
+
+async def _deferred_init(app: FastAPI):
+    """
+    Runs startup I/O after the server is already listening.
+    Flips app.state.ready so /health/ready starts returning 200.
+
+    A failing create_tables() (database down, missing grants) is logged and
+    retried with backoff; /health/ready keeps returning 503 meanwhile.
+    """
+    if settings.RUN_DDL_ON_STARTUP:
+        delay = 1
+        while True:
+            try:
+                await create_tables()
+                break
+            except Exception:
+                logger.exception("[APP] create_tables() failed, retrying in %ss", delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60)
+    else:
+        logger.info("[APP] RUN_DDL_ON_STARTUP disabled, skipping create_tables()")
+    
+    # Load the Docling models and open the Gemini connection before taking
+    # traffic, so the first request doesn't pay for them
+    if settings.WARMUP_ON_STARTUP:
+        await asyncio.gather(document_service.warmup(), tts_service.warmup())
+    app.state.ready = True
+    logger.info("[APP] %s v%s ready", settings.APP_TITLE, settings.APP_VERSION)
+
+
+def _log_init_failure(task: asyncio.Task):
+    """Logs an unexpected _deferred_init failure instead of leaving it unretrieved."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(
+            "[APP] Startup initialization failed, app will stay not ready",
+            exc_info=task.exception(),
+        )
 
 
 @asynccontextmanager
@@ -21,15 +63,23 @@ async def lifespan(app: FastAPI):
     Application lifespan manager.
     Handles startup and shutdown events.
     """
-    # Startup
+    # Startup - don't block socket binding on DB work
     logger.info("[APP] Starting up...")
-    await create_tables()
-    logger.info(f"[APP] {settings.APP_TITLE} v{settings.APP_VERSION} ready")
-    
+    # Blocking I/O (GCS uploads, URL signing) runs via asyncio.to_thread; the
+    # default pool (cpu_count + 4) would queue concurrent uploads behind each other
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=settings.THREADPOOL_WORKERS, thread_name_prefix="io")
+    )
+    app.state.ready = False
+    init_task = asyncio.create_task(_deferred_init(app))
+    init_task.add_done_callback(_log_init_failure)
+
     yield
     
     # Shutdown
     logger.info("[APP] Shutting down...")
+    if not init_task.done():
+        init_task.cancel()
     await close_database()
     logger.info("[APP] Shutdown complete")
 
@@ -63,7 +113,7 @@ def create_app() -> FastAPI:
     app.include_router(podcast.router)
     app.include_router(voices.router)
 
-    logger.info(f"[APP] {settings.APP_TITLE} v{settings.APP_VERSION} initialized")
+    logger.info("[APP] %s v%s initialized", settings.APP_TITLE, settings.APP_VERSION)
 
     return app
 
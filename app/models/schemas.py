@@ -20,6 +20,20 @@ class PodcastRequest(BaseModel):
     hosts_vozes: Optional[List[HostVoice]] = Field(default=None, description="Configuração de vozes por host")
 
 
+class ScriptRequest(BaseModel):
+    """Request para gerar apenas o script (JSON ou formulário)"""
+    tema: str = Field(..., description="Tema ou conteúdo base para o podcast")
+    duracao_minutos: int = Field(default=3, ge=1, le=60, description="Duração aproximada em minutos (1-60)")
+    num_hosts: int = Field(default=2, ge=1, le=10, description="Número de hosts do podcast (1-10)")
+    cache: bool = Field(default=True, description="false gera um script novo em vez de reutilizar um em cache")
+
+
+class EnhanceRequest(BaseModel):
+    """Request para aprimorar um texto (JSON ou formulário)"""
+    texto: str = Field(..., description="Texto ou ideia a ser aprimorada")
+    cache: bool = Field(default=True, description="false gera um texto novo em vez de reutilizar um em cache")
+
+
 class PodcastScriptResponse(BaseModel):
     """Response com apenas o script gerado"""
     script: str
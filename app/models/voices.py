@@ -2,58 +2,54 @@
 Voice configuration and available voices for Gemini TTS.
 """
 
+from functools import lru_cache
 from typing import List
 from app.models.schemas import HostVoice
 
 
-# Vozes disponíveis do Gemini TTS
-VOZES_DISPONIVEIS = {
+# Vozes do Gemini TTS: (nome, gênero)
+_VOICES: tuple[tuple[str, str], ...] = (
     # Femininas
-    "Achernar", "Aoede", "Autonoe", "Callirrhoe", "Despina", "Erinome",
-    "Gacrux", "Kore", "Laomedeia", "Leda", "Pulcherrima", "Sulafat",
-    "Vindemiatrix", "Zephyr",
+    ("Achernar", "Feminino"), ("Aoede", "Feminino"), ("Autonoe", "Feminino"),
+    ("Callirrhoe", "Feminino"), ("Despina", "Feminino"), ("Erinome", "Feminino"),
+    ("Gacrux", "Feminino"), ("Kore", "Feminino"), ("Laomedeia", "Feminino"),
+    ("Leda", "Feminino"), ("Pulcherrima", "Feminino"), ("Sulafat", "Feminino"),
+    ("Vindemiatrix", "Feminino"), ("Zephyr", "Feminino"),
     # Masculinas
-    "Achird", "Algenib", "Algieba", "Alnilam", "Charon", "Enceladus",
-    "Fenrir", "Iapetus", "Orus", "Puck", "Rasalgethi", "Sadachbia",
-    "Sadaltager", "Schedar", "Umbriel", "Zubenelgenubi"
-}
+    ("Achird", "Masculino"), ("Algenib", "Masculino"), ("Algieba", "Masculino"),
+    ("Alnilam", "Masculino"), ("Charon", "Masculino"), ("Enceladus", "Masculino"),
+    ("Fenrir", "Masculino"), ("Iapetus", "Masculino"), ("Orus", "Masculino"),
+    ("Puck", "Masculino"), ("Rasalgethi", "Masculino"), ("Sadachbia", "Masculino"),
+    ("Sadaltager", "Masculino"), ("Schedar", "Masculino"), ("Umbriel", "Masculino"),
+    ("Zubenelgenubi", "Masculino"),
+)
+
+# Vozes disponíveis do Gemini TTS
+VOZES_DISPONIVEIS: frozenset[str] = frozenset(name for name, _ in _VOICES)
+
+# Voz usada quando o vozId informado não existe
+FALLBACK_VOICE = "Zephyr"
+
+
+@lru_cache()
+def get_voices_list() -> List[dict]:
+    """
+    Returns the full list of voices with metadata, built on first use.
+    
+    Returns:
+        List of dicts with "id", "nome" and "genero"
+    """
+    return [{"id": name, "nome": name, "genero": gender} for name, gender in _VOICES]
 
-# Lista completa de vozes com metadados
-VOZES_LISTA = [
-    {"id": "Achernar", "nome": "Achernar", "genero": "Feminino"},
-    {"id": "Aoede", "nome": "Aoede", "genero": "Feminino"},
-    {"id": "Autonoe", "nome": "Autonoe", "genero": "Feminino"},
-    {"id": "Callirrhoe", "nome": "Callirrhoe", "genero": "Feminino"},
-    {"id": "Despina", "nome": "Despina", "genero": "Feminino"},
-    {"id": "Erinome", "nome": "Erinome", "genero": "Feminino"},
-    {"id": "Gacrux", "nome": "Gacrux", "genero": "Feminino"},
-    {"id": "Kore", "nome": "Kore", "genero": "Feminino"},
-    {"id": "Laomedeia", "nome": "Laomedeia", "genero": "Feminino"},
-    {"id": "Leda", "nome": "Leda", "genero": "Feminino"},
-    {"id": "Pulcherrima", "nome": "Pulcherrima", "genero": "Feminino"},
-    {"id": "Sulafat", "nome": "Sulafat", "genero": "Feminino"},
-    {"id": "Vindemiatrix", "nome": "Vindemiatrix", "genero": "Feminino"},
-    {"id": "Zephyr", "nome": "Zephyr", "genero": "Feminino"},
-    {"id": "Achird", "nome": "Achird", "genero": "Masculino"},
-    {"id": "Algenib", "nome": "Algenib", "genero": "Masculino"},
-    {"id": "Algieba", "nome": "Algieba", "genero": "Masculino"},
-    {"id": "Alnilam", "nome": "Alnilam", "genero": "Masculino"},
-    {"id": "Charon", "nome": "Charon", "genero": "Masculino"},
-    {"id": "Enceladus", "nome": "Enceladus", "genero": "Masculino"},
-    {"id": "Fenrir", "nome": "Fenrir", "genero": "Masculino"},
-    {"id": "Iapetus", "nome": "Iapetus", "genero": "Masculino"},
-    {"id": "Orus", "nome": "Orus", "genero": "Masculino"},
-    {"id": "Puck", "nome": "Puck", "genero": "Masculino"},
-    {"id": "Rasalgethi", "nome": "Rasalgethi", "genero": "Masculino"},
-    {"id": "Sadachbia", "nome": "Sadachbia", "genero": "Masculino"},
-    {"id": "Sadaltager", "nome": "Sadaltager", "genero": "Masculino"},
-    {"id": "Schedar", "nome": "Schedar", "genero": "Masculino"},
-    {"id": "Umbriel", "nome": "Umbriel", "genero": "Masculino"},
-    {"id": "Zubenelgenubi", "nome": "Zubenelgenubi", "genero": "Masculino"},
-]
 
 # Vozes padrão para hosts (alternando entre feminino e masculino)
-DEFAULT_VOICES = ["Zephyr", "Puck", "Aoede", "Charon", "Leda", "Fenrir", "Kore", "Orus", "Gacrux", "Algenib"]
+DEFAULT_VOICES: tuple[str, ...] = ("Zephyr", "Puck", "Aoede", "Charon", "Leda", "Fenrir", "Kore", "Orus", "Gacrux", "Algenib")
+
+# Configurações padrão pré-construídas para hostNumber 1..10 (entrada confiável, sem validação)
+_DEFAULT_HOST_VOICES: tuple[HostVoice, ...] = tuple(
+    HostVoice.model_construct(hostNumber=i + 1, vozId=voice)
+    for i, voice in enumerate(DEFAULT_VOICES)
+)
 
 
 def get_voice_by_id(voice_id: str) -> str:
@@ -64,22 +60,23 @@ def get_voice_by_id(voice_id: str) -> str:
         voice_id: The voice ID to validate
         
     Returns:
-        Valid voice ID or "Zephyr" as fallback
+        Valid voice ID or FALLBACK_VOICE
     """
-    return voice_id if voice_id in VOZES_DISPONIVEIS else "Zephyr"
+    return voice_id if voice_id in VOZES_DISPONIVEIS else FALLBACK_VOICE
 
 
 def get_default_voice_configs(num_hosts: int) -> List[HostVoice]:
     """
-    Generates default voice configuration alternating between female and male voices.
+    Returns default voice configuration alternating between female and male voices.
+    
+    The HostVoice objects are shared module-level instances; use
+    model_copy() instead of mutating them.
     
     Args:
-        num_hosts: Number of hosts to generate configs for
+        num_hosts: Number of hosts to generate configs for (at most 10;
+            callers validate it, larger counts get only 10 configs)
         
     Returns:
         List of HostVoice configurations
     """
-    return [
-        HostVoice(hostNumber=i+1, vozId=DEFAULT_VOICES[i % len(DEFAULT_VOICES)])
-        for i in range(num_hosts)
-    ]
+    return list(_DEFAULT_HOST_VOICES[:num_hosts])
@@ -3,29 +3,35 @@ Text enhancement endpoint.
 """
 
 import logging
-from fastapi import APIRouter, Form, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 
-from app.models.schemas import EnhanceResponse
+from app.models.schemas import EnhanceRequest, EnhanceResponse
 from app.services.enhance_service import enhance_service
+from app.utils.request_body import json_or_form, json_or_form_openapi
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-@router.post("/enhance", response_model=EnhanceResponse)
-async def enhance_text_endpoint(
-    texto: str = Form(...),
-):
+@router.post(
+    "/enhance",
+    response_model=EnhanceResponse,
+    openapi_extra=json_or_form_openapi(EnhanceRequest),
+)
+async def enhance_text_endpoint(body: EnhanceRequest = Depends(json_or_form(EnhanceRequest))):
     """
     Aprimora o texto do usuário usando IA.
     Transforma uma ideia simples em uma descrição mais rica e detalhada.
+    Aceita JSON ou formulário; envie cache=false para ignorar respostas em
+    cache e gerar um texto novo.
     """
+    texto = body.texto
     if not texto.strip():
         raise HTTPException(status_code=400, detail="Texto não pode estar vazio")
     
-    logger.info(f"[API] POST /enhance - Texto: {texto[:50]}...")
-    texto_aprimorado = await enhance_service.enhance_text(texto)
+    logger.info("[API] POST /enhance - Texto: %s...", texto[:50])
+    texto_aprimorado = await enhance_service.enhance_text(texto, use_cache=body.cache)
     
     return EnhanceResponse(
         texto_original=texto,
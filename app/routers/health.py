@@ -1,9 +1,10 @@
 """
-Health check endpoint.
+Health check endpoints.
 """
 
 import logging
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
 
 logger = logging.getLogger(__name__)
 
@@ -15,3 +16,17 @@ async def root():
     """Health check endpoint"""
     logger.debug("[API] Health check chamado")
     return {"status": "ok", "message": "Podcast Generator API"}
+
+
+@router.get("/health/live")
+async def liveness():
+    """Liveness probe - always OK once the process is serving"""
+    return {"status": "ok"}
+
+
+@router.get("/health/ready")
+async def readiness(request: Request):
+    """Readiness probe - 503 until deferred startup work has finished"""
+    if not getattr(request.app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready"}
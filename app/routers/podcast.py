@@ -2,28 +2,83 @@
 Podcast generation endpoints.
 """
 
-import json
+import asyncio
 import logging
+import queue
 import re
 import uuid
-from typing import List, Optional
+from functools import lru_cache
+from typing import AsyncIterator, Iterator, List, Optional
 
-from fastapi import APIRouter, Form, UploadFile, File, Query, HTTPException
-from fastapi.responses import Response
+import orjson
+from fastapi import APIRouter, Depends, Form, UploadFile, File, Query, HTTPException
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 
-from app.models.schemas import HostVoice, PodcastScriptResponse
+from app.core.config import settings
+from app.models.schemas import HostVoice, PodcastScriptResponse, ScriptRequest
 from app.models.voices import get_default_voice_configs
 from app.services.script_service import script_service
 from app.services.tts_service import tts_service
 from app.services.document_service import document_service
 from app.services.storage_service import storage_service
 from app.services.podcast_repository import podcast_repository
+from app.utils.audio import AUDIO_ENCODING_AVAILABLE, AUDIO_FORMATS, finalize_wav_header
+from app.utils.request_body import json_or_form, json_or_form_openapi
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/podcast", tags=["podcast"])
 
+# Matches the "Speaker N:" turn prefix in generated scripts
+_SPEAKER_RE = re.compile(r'Speaker (\d+):')
+
+
+@lru_cache(maxsize=512)
+def _parse_voices(payload: str, num_hosts: int) -> tuple[HostVoice, ...]:
+    """
+    Parses the hosts_vozes JSON string into HostVoice configs.
+    
+    Hosts missing from the payload get the default voices, so the result
+    always covers num_hosts. Memoized on (payload, num_hosts): clients usually
+    resend the same voice setup, and the tuple is safe to share.
+    
+    Raises:
+        ValueError: If the JSON is invalid or a voice fails validation
+        TypeError: If an entry is not a JSON object
+    """
+    voices = tuple(HostVoice(**v) for v in orjson.loads(payload))
+    if len(voices) < num_hosts:
+        voices += tuple(get_default_voice_configs(num_hosts)[len(voices):])
+    return voices
+
+
+def _resolve_audio_format(requested: Optional[str]) -> str:
+    """
+    Picks the output audio format: the ?format= query or AUDIO_FORMAT.
+    
+    Falls back to WAV when PyAV is not installed.
+    
+    Raises:
+        HTTPException: 400 if the format is unknown
+    """
+    audio_format = (requested or settings.AUDIO_FORMAT).lower()
+    if audio_format not in AUDIO_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato de áudio inválido: {audio_format}. Use: {', '.join(AUDIO_FORMATS)}",
+        )
+    if audio_format != "wav" and not AUDIO_ENCODING_AVAILABLE:
+        logger.warning("[API] PyAV não instalado, retornando WAV em vez de %s", audio_format)
+        return "wav"
+    return audio_format
+
+
+def _audio_headers(audio_format: str) -> dict[str, str]:
+    """Content-Disposition header for an audio download in the given format."""
+    extension = AUDIO_FORMATS[audio_format][1]
+    return {"Content-Disposition": f"attachment; filename=podcast.{extension}"}
+
 
 # Response models
 class PodcastResponse(BaseModel):
@@ -52,18 +107,129 @@ class PodcastGenerateResponse(BaseModel):
     audio_url: str
 
 
-@router.post("/script", response_model=PodcastScriptResponse)
-async def generate_script_endpoint(
-    tema: str = Form(...),
-    duracao_minutos: int = Form(default=3),
-    num_hosts: int = Form(default=2),
-):
+# Sentinels fed to the uploader thread after the last audio chunk
+_UPLOAD_DONE = object()
+_UPLOAD_ABORT = object()
+
+
+def _iter_upload_queue(upload_queue: queue.SimpleQueue) -> Iterator[bytes]:
+    """Yields the chunks fed by the request; raises if generation was aborted."""
+    while (chunk := upload_queue.get()) is not _UPLOAD_DONE:
+        if chunk is _UPLOAD_ABORT:
+            raise RuntimeError("Geração de áudio interrompida, upload cancelado")
+        yield chunk
+
+
+async def _generate_and_save(
+    audio_stream: AsyncIterator[bytes],
+    user_id: str,
+    tema: str,
+    duracao_minutos: int,
+    audio_format: str = "wav",
+) -> tuple[bytearray, Optional[str]]:
+    """
+    Collects the TTS stream while uploading it to GCS, then inserts the row.
+    
+    Opus and FLAC chunks are handed to the uploader thread as they arrive,
+    so the upload overlaps synthesis instead of following it. WAV is
+    uploaded once synthesis ends: its header carries the data size, which
+    is only known then and cannot be patched into an upload already sent.
+    The DB insert runs alongside the upload (flush); if one of them fails,
+    the other is rolled back.
+    
+    Returns:
+        Tuple of (complete audio, new podcast ID or None if saving failed)
+    """
+    # Generate title from theme (first 100 chars)
+    title = tema[:100] if len(tema) > 100 else tema
+    content_type, extension = AUDIO_FORMATS[audio_format]
+    filename = f"{uuid.uuid4()}.{extension}"
+    audio_url, audio_path = storage_service.build_audio_location(user_id, filename)
+    
+    # One growing buffer instead of a chunk list plus a joined copy
+    audio = bytearray()
+    if audio_format == "wav":
+        async for chunk in audio_stream:
+            audio.extend(chunk)
+        # Real RIFF/data sizes for both the response and the stored object
+        finalize_wav_header(audio)
+        upload = asyncio.ensure_future(asyncio.to_thread(
+            storage_service.upload_audio, audio, user_id, filename, content_type
+        ))
+    else:
+        # Unbounded on purpose: the chunks are kept for the response anyway, and
+        # a failed uploader must never block the event loop on a full queue
+        upload_queue: queue.SimpleQueue = queue.SimpleQueue()
+        upload = asyncio.ensure_future(asyncio.to_thread(
+            storage_service.upload_audio_chunks,
+            _iter_upload_queue(upload_queue),
+            user_id,
+            filename,
+            content_type,
+        ))
+        try:
+            async for chunk in audio_stream:
+                audio.extend(chunk)
+                upload_queue.put(chunk)
+        except BaseException:
+            # TTS failed or the client went away: the uploader drops the partial object
+            upload_queue.put(_UPLOAD_ABORT)
+            upload.add_done_callback(lambda t: t.cancelled() or t.exception())
+            raise
+        upload_queue.put(_UPLOAD_DONE)
+    
+    logger.info("[API] /podcast/generate - Áudio gerado: %s bytes (%s)", len(audio), audio_format)
+    
+    upload_result, create_result = await asyncio.gather(
+        upload,
+        podcast_repository.create(
+            user_id=user_id,
+            title=title,
+            theme=tema[:500] if len(tema) > 500 else tema,
+            duration_minutes=duracao_minutos,
+            audio_url=audio_url,
+            audio_path=audio_path,
+        ),
+        return_exceptions=True,
+    )
+    
+    upload_failed = isinstance(upload_result, BaseException)
+    create_failed = isinstance(create_result, BaseException)
+    if not upload_failed and not create_failed:
+        podcast_id = str(create_result.id)
+        logger.info("[API] Podcast saved with id: %s", podcast_id)
+        return audio, podcast_id
+    
+    # Roll back whichever half succeeded so no orphans are left behind
+    logger.error(
+        "[API] Failed to save podcast: %s",
+        upload_result if upload_failed else create_result,
+    )
+    try:
+        if not create_failed:
+            await podcast_repository.delete(create_result.id, user_id)
+        if not upload_failed:
+            await asyncio.to_thread(storage_service.delete_audio, audio_path)
+    except Exception as e:
+        logger.error("[API] Failed to roll back partial save: %s", e)
+    return audio, None
+
+
+@router.post(
+    "/script",
+    response_model=PodcastScriptResponse,
+    openapi_extra=json_or_form_openapi(ScriptRequest),
+)
+async def generate_script_endpoint(body: ScriptRequest = Depends(json_or_form(ScriptRequest))):
     """
     Gera apenas o script do podcast (sem áudio).
     Útil para preview e ajustes antes de gerar o áudio.
+    Aceita JSON ou formulário; envie cache=false para gerar um script novo
+    mesmo para um tema repetido.
     """
-    logger.info(f"[API] POST /podcast/script - Tema: {tema[:50]}..., Duração: {duracao_minutos} min, Hosts: {num_hosts}")
-    script = await script_service.generate_script(tema, duracao_minutos, num_hosts)
+    tema, duracao_minutos, num_hosts = body.tema, body.duracao_minutos, body.num_hosts
+    logger.info("[API] POST /podcast/script - Tema: %s..., Duração: %s min, Hosts: %s", tema[:50], duracao_minutos, num_hosts)
+    script = await script_service.generate_script(tema, duracao_minutos, num_hosts, use_cache=body.cache)
     logger.info("[API] /podcast/script concluído com sucesso")
     return PodcastScriptResponse(script=script)
 
@@ -71,11 +237,13 @@ async def generate_script_endpoint(
 @router.post("/generate")
 async def create_podcast(
     tema: str = Form(...),
-    duracao_minutos: int = Form(default=3),
-    num_hosts: int = Form(default=2),
+    duracao_minutos: int = Form(default=3, ge=1, le=60),
+    num_hosts: int = Form(default=2, ge=1, le=10),
     hosts_vozes: str = Form(default=None),
     user_id: str = Form(default=None),
     documentos: List[UploadFile] = File(default=[]),
+    cache: bool = Form(default=True),
+    audio_format: Optional[str] = Query(default=None, alias="format", description="opus, flac ou wav"),
 ):
     """
     Gera um podcast completo a partir do tema.
@@ -83,7 +251,7 @@ async def create_podcast(
     1. Usa LLM para criar o script do diálogo
     2. Converte o script em áudio usando TTS
     3. Salva o áudio no GCS e metadados no banco (se user_id fornecido)
-    4. Retorna o áudio em formato WAV
+    4. Retorna o áudio em Opus, FLAC ou WAV (em streaming quando não há user_id)
     
     Args:
         tema: Tema ou conteúdo base para o podcast
@@ -92,86 +260,72 @@ async def create_podcast(
         hosts_vozes: JSON string com configuração de vozes [{\"hostNumber\": 1, \"vozId\": \"Zephyr\"}, ...]
         user_id: ID do usuário (WSO2 sub) para salvar o podcast
         documentos: Arquivos opcionais para usar como base
+        cache: false gera um script novo em vez de reutilizar um em cache
+        audio_format: Formato do áudio (?format=); padrão AUDIO_FORMAT
     """
-    logger.info(f"[API] POST /podcast/generate - Tema: {tema[:50]}..., Duração: {duracao_minutos} min, Hosts: {num_hosts}, User: {user_id}")
+    audio_format = _resolve_audio_format(audio_format)
+    logger.info("[API] POST /podcast/generate - Tema: %s..., Duração: %s min, Hosts: %s, User: %s", tema[:50], duracao_minutos, num_hosts, user_id)
     
     # Parse hosts_vozes from JSON string
     parsed_voices: List[HostVoice] = []
     if hosts_vozes:
         try:
-            voices_data = json.loads(hosts_vozes)
-            parsed_voices = [HostVoice(**v) for v in voices_data]
-            logger.debug(f"[API] Vozes configuradas: {parsed_voices}")
-        except (json.JSONDecodeError, ValueError) as e:
-            logger.warning(f"[API] Erro ao parsear hosts_vozes, usando padrão: {e}")
+            parsed_voices = list(_parse_voices(hosts_vozes, num_hosts))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("[API] Vozes configuradas: %s", parsed_voices)
+        except (orjson.JSONDecodeError, ValueError, TypeError) as e:
+            logger.warning("[API] Erro ao parsear hosts_vozes, usando padrão: %s", e)
             parsed_voices = get_default_voice_configs(num_hosts)
     else:
         parsed_voices = get_default_voice_configs(num_hosts)
     
-    # Ensure we have voices for all hosts
-    if len(parsed_voices) < num_hosts:
-        for i in range(len(parsed_voices) + 1, num_hosts + 1):
-            default_voice = get_default_voice_configs(1)[0]
-            default_voice.hostNumber = i
-            parsed_voices.append(default_voice)
-    
     # Process documents using Docling
     documentos_conteudo = ""
     if documentos:
-        files_to_process = []
+        # Uploads are already spooled to disk; reject oversized ones before
+        # spending conversion time and LLM tokens on them
         for doc in documentos:
-            content = await doc.read()
-            files_to_process.append((doc.filename, content))
-        documentos_conteudo = await document_service.process_uploaded_files(files_to_process)
-    
-    # Combine theme with document content
-    tema_completo = tema
-    if documentos_conteudo:
-        tema_completo = f"{tema}\n\n## Material de Referência:{documentos_conteudo}"
+            if doc.size is not None and doc.size > settings.DOCUMENT_MAX_UPLOAD_BYTES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Documento muito grande: {doc.filename}. Limite: {settings.DOCUMENT_MAX_UPLOAD_BYTES} bytes",
+                )
+        # Hand over the spooled upload files so content is streamed, not copied
+        files_to_process = [(doc.filename, doc.file) for doc in documentos]
+        # Warm the TTS connection while Docling parses the documents
+        async with asyncio.TaskGroup() as tg:
+            docs_task = tg.create_task(document_service.process_uploaded_files(files_to_process))
+            tg.create_task(tts_service.warmup())
+        documentos_conteudo = docs_task.result()
+    
+    # Generate script via LLM, with the document content as reference material
+    script = await script_service.generate_script(
+        tema, duracao_minutos, num_hosts, use_cache=cache, referencia=documentos_conteudo
+    )
     
-    # Generate script via LLM
-    script = await script_service.generate_script(tema_completo, duracao_minutos, num_hosts)
+    media_type = AUDIO_FORMATS[audio_format][0]
+    headers = _audio_headers(audio_format)
     
-    # Generate audio via TTS
-    audio = tts_service.generate_audio(script, parsed_voices)
+    # Without persistence, stream audio to the client as TTS produces it
+    if not user_id:
+        audio_stream = await tts_service.stream_audio(script, parsed_voices, audio_format)
+        return StreamingResponse(audio_stream, media_type=media_type, headers=headers)
     
-    logger.info(f"[API] /podcast/generate - Áudio gerado: {len(audio)} bytes")
+    # user_id provided: save to storage and database before responding,
+    # the X-Podcast-Id header needs the saved record. The upload runs while
+    # the audio is still being synthesized
+    audio_stream = await tts_service.stream_audio(script, parsed_voices, audio_format)
+    audio, podcast_id = await _generate_and_save(
+        audio_stream, user_id, tema, duracao_minutos, audio_format
+    )
     
-    # If user_id provided, save to storage and database
-    podcast_id = None
-    if user_id:
-        try:
-            # Generate title from theme (first 100 chars)
-            title = tema[:100] if len(tema) > 100 else tema
-            
-            # Upload to GCS
-            audio_url, audio_path = storage_service.upload_audio(audio, user_id)
-            
-            # Save to database
-            podcast = await podcast_repository.create(
-                user_id=user_id,
-                title=title,
-                theme=tema[:500] if len(tema) > 500 else tema,
-                duration_minutes=duracao_minutos,
-                audio_url=audio_url,
-                audio_path=audio_path,
-            )
-            podcast_id = str(podcast.id)
-            logger.info(f"[API] Podcast saved with id: {podcast_id}")
-        except Exception as e:
-            logger.error(f"[API] Failed to save podcast: {e}")
-            # Continue without saving - still return the audio
-    
-    # Return audio as WAV
-    headers = {
-        "Content-Disposition": "attachment; filename=podcast.wav"
-    }
     if podcast_id:
         headers["X-Podcast-Id"] = podcast_id
     
+    # memoryview hands the buffer to the response without copying it to bytes
     return Response(
-        content=audio,
-        media_type="audio/wav",
+        content=memoryview(audio),
+        media_type=media_type,
         headers=headers
     )
 
@@ -190,32 +344,39 @@ async def list_podcasts(
         limit: Número máximo de resultados (1-100)
         offset: Número de resultados para pular
     """
-    logger.info(f"[API] GET /podcast/list - User: {user_id}, Limit: {limit}, Offset: {offset}")
+    logger.info("[API] GET /podcast/list - User: %s, Limit: %s, Offset: %s", user_id, limit, offset)
     
-    podcasts = await podcast_repository.list_by_user(user_id, limit, offset)
-    total = await podcast_repository.count_by_user(user_id)
+    podcasts, total = await podcast_repository.list_with_total_by_user(user_id, limit, offset)
     
-    # Generate signed URLs for each podcast
-    podcast_responses = []
-    for p in podcasts:
-        try:
-            signed_url = storage_service.get_signed_url(p.audio_path, expiration_hours=1)
-        except Exception as e:
-            logger.warning(f"[API] Failed to generate signed URL for {p.id}: {e}")
-            signed_url = p.audio_url  # Fallback to stored URL
-        
-        podcast_responses.append(PodcastResponse(
+    # Generate signed URLs for each podcast; cache misses sign in parallel threads
+    signed_urls = await asyncio.gather(
+        *(asyncio.to_thread(_signed_url_or_fallback, p) for p in podcasts)
+    )
+    
+    podcast_responses = [
+        PodcastResponse(
             id=str(p.id),
             title=p.title,
             theme=p.theme,
             duration_minutes=p.duration_minutes,
             audio_url=signed_url,
             created_at=p.created_at.isoformat(),
-        ))
+        )
+        for p, signed_url in zip(podcasts, signed_urls)
+    ]
     
     return PodcastListResponse(podcasts=podcast_responses, total=total)
 
 
+def _signed_url_or_fallback(podcast) -> str:
+    """Signed URL for a podcast's audio, or its stored URL if signing fails."""
+    try:
+        return storage_service.get_signed_url(podcast.audio_path, expiration_hours=1)
+    except Exception as e:
+        logger.warning("[API] Failed to generate signed URL for %s: %s", podcast.id, e)
+        return podcast.audio_url  # Fallback to stored URL
+
+
 @router.get("/{podcast_id}")
 async def get_podcast(
     podcast_id: str,
@@ -243,9 +404,11 @@ async def get_podcast(
     
     # Generate signed URL
     try:
-        signed_url = storage_service.get_signed_url(podcast.audio_path, expiration_hours=2)
+        signed_url = await asyncio.to_thread(
+            storage_service.get_signed_url, podcast.audio_path, expiration_hours=2
+        )
     except Exception as e:
-        logger.error(f"[API] Failed to generate signed URL: {e}")
+        logger.error("[API] Failed to generate signed URL: %s", e)
         signed_url = podcast.audio_url
     
     return PodcastResponse(
@@ -275,22 +438,17 @@ async def delete_podcast(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid podcast ID format")
     
-    # Get podcast first to get the audio path
-    podcast = await podcast_repository.get_by_id(pid)
+    # Delete from database; ownership is part of the WHERE clause, so a podcast
+    # owned by someone else is reported as not found
+    audio_path = await podcast_repository.delete(pid, user_id)
     
-    if not podcast:
+    if audio_path is None:
         raise HTTPException(status_code=404, detail="Podcast not found")
     
-    if podcast.user_id != user_id:
-        raise HTTPException(status_code=403, detail="Not authorized to delete this podcast")
-    
-    # Delete from GCS
-    storage_service.delete_audio(podcast.audio_path)
-    
-    # Delete from database
-    await podcast_repository.delete(pid, user_id)
+    # Delete from GCS (failures are logged and leave only an orphan blob)
+    await asyncio.to_thread(storage_service.delete_audio, audio_path)
     
-    logger.info(f"[API] Deleted podcast {podcast_id}")
+    logger.info("[API] Deleted podcast %s", podcast_id)
     
     return {"message": "Podcast deleted successfully", "id": podcast_id}
 
@@ -299,6 +457,7 @@ async def delete_podcast(
 async def create_podcast_from_script(
     script: str = Form(...),
     hosts_vozes: str = Form(default=None),
+    audio_format: Optional[str] = Query(default=None, alias="format", description="opus, flac ou wav"),
 ):
     """
     Gera áudio a partir de um script já pronto.
@@ -307,33 +466,37 @@ async def create_podcast_from_script(
     Args:
         script: Script formatado com Speaker 1, Speaker 2, etc.
         hosts_vozes: JSON string com configuração de vozes
+        audio_format: Formato do áudio (?format=); padrão AUDIO_FORMAT
     """
-    logger.info(f"[API] POST /podcast/generate-from-script - Script: {len(script)} chars")
+    audio_format = _resolve_audio_format(audio_format)
+    logger.info("[API] POST /podcast/generate-from-script - Script: %s chars", len(script))
     
     # Count how many speakers exist in the script
-    speakers = set(re.findall(r'Speaker (\d+):', script))
-    num_hosts = max([int(s) for s in speakers]) if speakers else 2
-    
+    num_hosts = max((int(m.group(1)) for m in _SPEAKER_RE.finditer(script)), default=2)
+    # Same limit as num_hosts elsewhere; there are no voices for hosts past it
+    if num_hosts > 10:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Script com Speaker {num_hosts}: o máximo é 10 hosts",
+        )
+
     # Parse hosts_vozes
     parsed_voices: List[HostVoice] = []
     if hosts_vozes:
         try:
-            voices_data = json.loads(hosts_vozes)
-            parsed_voices = [HostVoice(**v) for v in voices_data]
-        except (json.JSONDecodeError, ValueError) as e:
-            logger.warning(f"[API] Erro ao parsear hosts_vozes: {e}")
+            parsed_voices = list(_parse_voices(hosts_vozes, num_hosts))
+        except (orjson.JSONDecodeError, ValueError, TypeError) as e:
+            logger.warning("[API] Erro ao parsear hosts_vozes: %s", e)
             parsed_voices = get_default_voice_configs(num_hosts)
     else:
         parsed_voices = get_default_voice_configs(num_hosts)
     
-    audio = tts_service.generate_audio(script, parsed_voices)
+    audio_stream = await tts_service.stream_audio(script, parsed_voices, audio_format)
     
-    logger.info(f"[API] /podcast/generate-from-script concluído - Áudio: {len(audio)} bytes")
+    logger.info("[API] /podcast/generate-from-script - Streaming de áudio iniciado")
     
-    return Response(
-        content=audio,
-        media_type="audio/wav",
-        headers={
-            "Content-Disposition": "attachment; filename=podcast.wav"
-        }
+    return StreamingResponse(
+        audio_stream,
+        media_type=AUDIO_FORMATS[audio_format][0],
+        headers=_audio_headers(audio_format),
     )
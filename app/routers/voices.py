@@ -2,16 +2,24 @@
 Voices listing endpoint.
 """
 
-from fastapi import APIRouter
+import orjson
+from fastapi import APIRouter, Response
 
-from app.models.voices import VOZES_LISTA
+from app.models.voices import get_voices_list
 
 router = APIRouter()
 
+# The voice list is static: serialize it once instead of on every request
+_VOICES_JSON = orjson.dumps({"vozes": get_voices_list()})
+
 
 @router.get("/vozes")
 async def list_voices():
     """
     Lista todas as vozes disponíveis do Gemini TTS.
     """
-    return {"vozes": VOZES_LISTA}
+    return Response(
+        content=_VOICES_JSON,
+        media_type="application/json",
+        headers={"Cache-Control": "public, max-age=3600"},
+    )
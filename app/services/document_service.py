@@ -3,27 +3,69 @@ Document processing service using Docling library.
 Extracts text content from PDF, DOCX, XLSX, PPTX and TXT files.
 """
 
+import asyncio
+import contextlib
+import hashlib
+import importlib.metadata
+import io
 import logging
 import tempfile
+import threading
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Tuple
+from typing import BinaryIO, List, Tuple
 
 from docling.document_converter import DocumentConverter, PdfFormatOption
 from docling.datamodel.pipeline_options import PdfPipelineOptions, AcceleratorOptions
 from docling.datamodel.base_models import InputFormat
 from docling_core.types.doc.labels import DocItemLabel
 
+from app.core.config import settings
+from app.utils.ooxml import OOXML_EXTRACTORS, extract_ooxml_text
+
 logger = logging.getLogger(__name__)
 
 # Check if CUDA is available, otherwise force CPU
 try:
     import torch
     DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+    if DEVICE == "cuda":
+        # Let float32 matmuls in the layout/OCR models use TF32 tensor cores
+        torch.set_float32_matmul_precision("high")
 except ImportError:
     DEVICE = "cpu"
 
-logger.info(f"[DOCUMENT] Using device: {DEVICE}")
+logger.info("[DOCUMENT] Using device: %s", DEVICE)
+
+# Documents of one request are converted in parallel; split the cores between
+# the workers so torch intra-op threads don't oversubscribe the CPU
+DOCUMENT_WORKERS = max(1, settings.DOCUMENT_WORKERS)
+CONVERTER_THREADS = max(1, min(4, (os.cpu_count() or 1) // DOCUMENT_WORKERS))
+_executor = ThreadPoolExecutor(max_workers=DOCUMENT_WORKERS, thread_name_prefix="docling")
+_thread_state = threading.local()
+
+# Part of the disk cache key: markdown converted by another Docling version or
+# with other pipeline options (e.g. TableFormer off) is not reused
+_CONVERSION_FINGERPRINT = hashlib.sha256(
+    f"{importlib.metadata.version('docling')}|table_structure={settings.DOCUMENT_TABLE_STRUCTURE}".encode()
+).hexdigest()[:8]
+
+
+def _device_context():
+    """
+    Runs the calling worker's GPU work on its own CUDA stream.
+    
+    PyTorch's current stream is thread-local, so documents converted by
+    different workers overlap on the GPU instead of serializing on the
+    default stream. A no-op on CPU.
+    """
+    if DEVICE != "cuda":
+        return contextlib.nullcontext()
+    stream = getattr(_thread_state, "cuda_stream", None)
+    if stream is None:
+        stream = _thread_state.cuda_stream = torch.cuda.Stream()
+    return torch.cuda.stream(stream)
 
 
 class DocumentService:
@@ -34,36 +76,65 @@ class DocumentService:
     def __init__(self):
         """Initialize the document converter."""
         self._converter = None
+        self._converter_lock = threading.Lock()
     
     @property
     def converter(self) -> DocumentConverter:
         """Lazy initialization of the converter with CPU-only configuration."""
         if self._converter is None:
-            logger.info("[DOCUMENT] Initializing Docling DocumentConverter...")
-            
-            # Configure accelerator for CPU (or CUDA if available)
-            accelerator_options = AcceleratorOptions(
-                num_threads=4,
-                device=DEVICE,
-            )
-            
-            # Configure PDF pipeline with CPU accelerator
-            pdf_pipeline_options = PdfPipelineOptions(
-                accelerator_options=accelerator_options,
-            )
-            
-            # Create converter with configured options
-            self._converter = DocumentConverter(
-                format_options={
-                    InputFormat.PDF: PdfFormatOption(
-                        pipeline_options=pdf_pipeline_options
-                    )
-                }
-            )
-            
-            logger.info(f"[DOCUMENT] DocumentConverter initialized with device: {DEVICE}")
+            with self._converter_lock:
+                if self._converter is None:
+                    self._converter = self._create_converter()
         return self._converter
     
+    def _create_converter(self) -> DocumentConverter:
+        """Builds the Docling converter (called once, under the lock)."""
+        logger.info("[DOCUMENT] Initializing Docling DocumentConverter...")
+        
+        # Configure accelerator for CPU (or CUDA if available)
+        accelerator_options = AcceleratorOptions(
+            num_threads=CONVERTER_THREADS,
+            device=DEVICE,
+        )
+        
+        # Configure PDF pipeline with CPU accelerator. Table structure
+        # recognition (TableFormer) is skipped by default for speed; without
+        # it Docling emits PDF tables with no cells, so their contents are
+        # dropped from the extracted text. DOCX/XLSX/PPTX tables are unaffected
+        pdf_pipeline_options = PdfPipelineOptions(
+            accelerator_options=accelerator_options,
+            artifacts_path=settings.DOCUMENT_ARTIFACTS_PATH or None,
+            do_table_structure=settings.DOCUMENT_TABLE_STRUCTURE,
+        )
+        
+        # Create converter with configured options
+        converter = DocumentConverter(
+            format_options={
+                InputFormat.PDF: PdfFormatOption(
+                    pipeline_options=pdf_pipeline_options
+                )
+            }
+        )
+        
+        logger.info("[DOCUMENT] DocumentConverter initialized with device: %s", DEVICE)
+        return converter
+    
+    async def warmup(self) -> None:
+        """
+        Builds the converter and its PDF pipeline ahead of the first request.
+        
+        Loading the layout models takes seconds, so this runs on the document
+        executor. Failures are only logged: the first conversion will retry.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                _executor, self.converter.initialize_pipeline, InputFormat.PDF
+            )
+            logger.info("[DOCUMENT] Docling converter warmed up")
+        except Exception as e:
+            logger.warning("[DOCUMENT] Docling warmup failed: %s", e)
+    
     def extract_text(self, file_content: bytes, filename: str) -> str:
         """
         Extracts text content from a document file.
@@ -72,87 +143,207 @@ class DocumentService:
             file_content: Raw bytes of the file
             filename: Original filename (used to determine format)
             
+        Returns:
+            Extracted text content as string
+        """
+        return self.extract_text_from_stream(io.BytesIO(file_content), filename)
+    
+    def extract_text_from_stream(self, stream: BinaryIO, filename: str) -> str:
+        """
+        Extracts text content from a file-like object without buffering it in memory.
+        
+        The stream is copied to a temporary file once, hashing it on the way,
+        and Docling reads that file directly.
+        
+        Args:
+            stream: Binary file object positioned at the start of the document
+            filename: Original filename (used to determine format)
+            
         Returns:
             Extracted text content as string
         """
         extension = Path(filename).suffix.lower()
         
         if extension not in self.SUPPORTED_EXTENSIONS:
-            logger.warning(f"[DOCUMENT] Unsupported file type: {extension}")
+            logger.warning("[DOCUMENT] Unsupported file type: %s", extension)
             return ""
         
         # Handle plain text files directly
         if extension == '.txt':
+            return self._decode_text(stream.read())
+        
+        try:
+            tmp_path, digest = self._spool_to_temp(stream, extension)
+        except OSError as e:
+            logger.exception("[DOCUMENT] Failed to spool %s: %s", filename, e)
+            return ""
+        
+        try:
+            return self._convert(filename, digest, tmp_path)
+        finally:
+            # Clean up temp file
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp_path)
+    
+    def _spool_to_temp(self, stream: BinaryIO, extension: str) -> tuple[str, str]:
+        """
+        Copies a stream to a named temporary file in 1 MiB chunks.
+        
+        Returns:
+            Tuple of (temp file path, blake2b hex digest of the content)
+        """
+        hasher = hashlib.blake2b(digest_size=16)
+        # Create temporary file with proper extension, Docling detects the format from it
+        with tempfile.NamedTemporaryFile(suffix=extension, delete=False) as tmp_file:
+            for chunk in iter(lambda: stream.read(1024 * 1024), b""):
+                hasher.update(chunk)
+                tmp_file.write(chunk)
+        return tmp_file.name, hasher.hexdigest()
+    
+    def _convert(self, filename: str, digest: str, path: str) -> str:
+        """
+        Extracts a DOCX/XLSX/PPTX straight from its XML, or converts with Docling.
+        
+        Office files only need their text as LLM context, so Docling's layout
+        pipeline is kept for PDFs and as a fallback when the fast path fails.
+        """
+        extension = Path(filename).suffix.lower()
+        if settings.DOCUMENT_OOXML_FAST_PATH and extension in OOXML_EXTRACTORS:
             try:
-                return file_content.decode('utf-8')
-            except UnicodeDecodeError:
-                try:
-                    return file_content.decode('latin-1')
-                except Exception as e:
-                    logger.error(f"[DOCUMENT] Failed to decode TXT file: {e}")
-                    return ""
+                text_content = extract_ooxml_text(path, extension)
+                if text_content.strip():
+                    logger.info(
+                        "[DOCUMENT] Extracted %s chars from %s (OOXML)", len(text_content), filename
+                    )
+                    return text_content
+            except Exception as e:
+                logger.warning("[DOCUMENT] OOXML fast path failed for %s: %s", filename, e)
+        return self._convert_cached(filename, digest, path)
+    
+    def _convert_cached(self, filename: str, digest: str, path: str) -> str:
+        """
+        Converts with Docling unless the same content was already extracted.
+        
+        Results are stored as Markdown under DOCUMENT_CACHE_DIR, keyed by the
+        content hash, the extension and the Docling version and pipeline
+        options, so the cache survives restarts.
+        
+        Args:
+            filename: Original filename (used for the extension and logs)
+            digest: Hex digest of the file content
+            path: Path to the document on disk
+            
+        Returns:
+            Extracted Markdown content, or "" on failure
+        """
+        if not settings.DOCUMENT_CACHE_DIR:
+            return self._convert_with_docling(filename, path)
+        
+        extension = Path(filename).suffix.lower()
+        cache_path = Path(settings.DOCUMENT_CACHE_DIR) / f"{digest}.{_CONVERSION_FINGERPRINT}{extension}.md"
+        
+        try:
+            text_content = cache_path.read_text(encoding="utf-8")
+            logger.info("[DOCUMENT] Cache hit for %s", filename)
+            return text_content
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning("[DOCUMENT] Failed to read cache for %s: %s", filename, e)
+        
+        text_content = self._convert_with_docling(filename, path)
         
+        # Don't cache failures, they may be transient
+        if text_content:
+            try:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                # Write then rename so concurrent readers never see partial files
+                tmp_path = cache_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+                tmp_path.write_text(text_content, encoding="utf-8")
+                os.replace(tmp_path, cache_path)
+            except OSError as e:
+                logger.warning("[DOCUMENT] Failed to write cache for %s: %s", filename, e)
+        
+        return text_content
+    
+    def _decode_text(self, file_content: bytes) -> str:
+        """Decodes a plain text file, falling back to latin-1."""
+        try:
+            return file_content.decode('utf-8')
+        except UnicodeDecodeError:
+            try:
+                return file_content.decode('latin-1')
+            except Exception as e:
+                logger.error("[DOCUMENT] Failed to decode TXT file: %s", e)
+                return ""
+    
+    def _convert_with_docling(self, filename: str, path: str) -> str:
+        """
+        Converts a document on disk with Docling.
+        
+        Args:
+            filename: Original filename (used for logs)
+            path: Path to the document, with its original extension
+            
+        Returns:
+            Extracted Markdown content, or "" on failure
+        """
         # Use Docling for other formats (PDF, DOCX, XLSX, PPTX)
         try:
-            # Create temporary file with proper extension
-            with tempfile.NamedTemporaryFile(
-                suffix=extension, 
-                delete=False
-            ) as tmp_file:
-                tmp_file.write(file_content)
-                tmp_path = tmp_file.name
+            logger.info("[DOCUMENT] Converting %s using Docling...", filename)
+            with _device_context():
+                result = self.converter.convert(path)
             
-            try:
-                logger.info(f"[DOCUMENT] Converting {filename} using Docling...")
-                result = self.converter.convert(tmp_path)
-                
-                # Export to Markdown for better formatting preservation
-                text_content = result.document.export_to_markdown()
-                
-                logger.info(
-                    f"[DOCUMENT] Extracted {len(text_content)} chars from {filename}"
-                )
-                return text_content
-                
-            finally:
-                # Clean up temp file
-                if os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
+            # Export to Markdown for better formatting preservation
+            text_content = result.document.export_to_markdown()
+            
+            logger.info(
+                "[DOCUMENT] Extracted %s chars from %s", len(text_content), filename
+            )
+            return text_content
                 
         except Exception as e:
-            logger.exception(f"[DOCUMENT] Failed to extract from {filename}: {e}")
+            logger.exception("[DOCUMENT] Failed to extract from %s: %s", filename, e)
             return ""
     
     async def process_uploaded_files(
         self, 
-        files: List[Tuple[str, bytes]]
+        files: List[Tuple[str, BinaryIO]]
     ) -> str:
         """
         Processes multiple uploaded files and combines their content.
         
         Args:
-            files: List of (filename, content) tuples
+            files: List of (filename, file object) tuples, e.g. UploadFile.file
             
         Returns:
             Combined text content from all files
         """
         combined_content = []
         
-        for filename, content in files:
-            logger.info(f"[DOCUMENT] Processing: {filename}")
-            text = self.extract_text(content, filename)
-            
+        for filename, _ in files:
+            logger.info("[DOCUMENT] Processing: %s", filename)
+        
+        # Docling is CPU-bound and blocking: convert all files in parallel,
+        # off the event loop, on the bounded document executor
+        loop = asyncio.get_running_loop()
+        texts = await asyncio.gather(*(
+            loop.run_in_executor(_executor, self.extract_text_from_stream, stream, filename)
+            for filename, stream in files
+        ))
+        
+        for (filename, _), text in zip(files, texts):
             if text.strip():
                 combined_content.append(
                     f"\n\n--- Conteúdo do documento: {filename} ---\n{text}"
                 )
             else:
-                logger.warning(f"[DOCUMENT] No content extracted from: {filename}")
+                logger.warning("[DOCUMENT] No content extracted from: %s", filename)
         
         total_files = len(files)
         extracted_files = len(combined_content)
         logger.info(
-            f"[DOCUMENT] Processed {extracted_files}/{total_files} files successfully"
+            "[DOCUMENT] Processed %s/%s files successfully", extracted_files, total_files
         )
         
         return "\n".join(combined_content)
@@ -3,15 +3,18 @@ Text enhancement service using Gemini LLM.
 """
 
 import logging
-from google import genai
+from google.genai import types
 from fastapi import HTTPException
 
 from app.core.config import settings
+from app.services.gemini_client import gemini_client, llm_semaphore
+from app.utils.cache import SingleFlight, TTLCache, make_cache_key
 
 logger = logging.getLogger(__name__)
 
 
-ENHANCE_PROMPT = """Você é um assistente especializado em aprimorar textos para podcasts.
+# Static instructions, sent as system_instruction so the request prefix is stable
+ENHANCE_SYSTEM_PROMPT = """Você é um assistente especializado em aprimorar textos para podcasts.
 
 Seu objetivo é pegar a ideia ou tema do usuário e transformá-lo em uma descrição mais rica, detalhada e interessante para servir como base para um podcast.
 
@@ -22,9 +25,11 @@ Seu objetivo é pegar a ideia ou tema do usuário e transformá-lo em uma descri
 4. Use português brasileiro formal mas acessível
 5. O texto deve ter entre 3-5 parágrafos
 6. NÃO inclua introduções como "Aqui está o texto aprimorado"
-7. Vá direto ao conteúdo aprimorado
+7. Vá direto ao conteúdo aprimorado"""
 
-## TEXTO ORIGINAL:
+
+# Per-request part of the prompt
+ENHANCE_PROMPT = """## TEXTO ORIGINAL:
 {texto}
 
 ## TEXTO APRIMORADO:"""
@@ -34,39 +39,65 @@ class EnhanceService:
     """Service for enhancing text using LLM."""
     
     def __init__(self):
-        self.client = genai.Client(api_key=settings.GEMINI_API_KEY)
+        self.client = gemini_client
+        self._cache: TTLCache[str] = TTLCache(
+            maxsize=settings.LLM_CACHE_MAXSIZE,
+            ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+        )
+        self._inflight: SingleFlight[str] = SingleFlight()
     
-    async def enhance_text(self, texto: str) -> str:
+    async def enhance_text(self, texto: str, use_cache: bool = True) -> str:
         """
         Uses Gemini to enhance user text.
         
         Args:
             texto: The original user text
+            use_cache: False skips the cache lookup and always calls Gemini
+                (the fresh text still replaces the cached one)
             
         Returns:
             Enhanced and expanded text
         """
-        logger.info(f"[ENHANCE] Aprimorando texto: {texto[:100]}...")
+        logger.info("[ENHANCE] Aprimorando texto: %s...", texto[:100])
+        
+        cache_key = make_cache_key("enhance", settings.LLM_MODEL, texto)
+        if not use_cache:
+            return await self._generate(cache_key, texto)
         
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            logger.info("[ENHANCE] Cache hit, tamanho: %s chars", len(cached))
+            return cached
+        
+        return await self._inflight.run(cache_key, lambda: self._generate(cache_key, texto))
+    
+    async def _generate(self, cache_key: str, texto: str) -> str:
+        """Calls Gemini for an enhance cache miss and stores the result."""
         try:
             prompt = ENHANCE_PROMPT.format(texto=texto)
             
-            response = self.client.models.generate_content(
-                model=settings.LLM_MODEL,
-                contents=prompt
-            )
+            async with llm_semaphore:
+                # Native async client: no worker thread held for the round-trip
+                response = await self.client.aio.models.generate_content(
+                    model=settings.LLM_MODEL,
+                    contents=prompt,
+                    config=types.GenerateContentConfig(
+                        system_instruction=ENHANCE_SYSTEM_PROMPT,
+                    ),
+                )
             
             if not response.text:
                 logger.error("[ENHANCE] Resposta vazia do Gemini")
                 raise HTTPException(status_code=500, detail="Falha ao aprimorar texto")
             
-            logger.info(f"[ENHANCE] Texto aprimorado com sucesso, tamanho: {len(response.text)} chars")
+            logger.info("[ENHANCE] Texto aprimorado com sucesso, tamanho: %s chars", len(response.text))
+            self._cache.set(cache_key, response.text)
             return response.text
             
         except HTTPException:
             raise
         except Exception as e:
-            logger.exception(f"[ENHANCE] Erro ao aprimorar texto: {e}")
+            logger.exception("[ENHANCE] Erro ao aprimorar texto: %s", e)
             raise HTTPException(status_code=500, detail=f"Erro ao aprimorar texto: {str(e)}")
 
 
@@ -0,0 +1,58 @@
+"""
+Shared Gemini client for the script, enhance and TTS services.
+"""
+
+import asyncio
+
+import httpx
+from google import genai
+from google.genai import types
+
+from app.core.config import settings
+
+
+def create_gemini_client() -> genai.Client:
+    """
+    Builds the Gemini client with an explicit timeout, connection pool and retries.
+    
+    A single client means a single httpx pool, so warm keep-alive connections
+    are reused by every service instead of each opening its own TLS sessions.
+    Transient failures (408/429/5xx, connection errors) are retried by the SDK
+    with exponential backoff and jitter.
+    
+    Returns:
+        Configured genai.Client
+        
+    Raises:
+        ValueError: If GEMINI_API_KEY is not set, so the app fails at startup
+            instead of on the first request
+    """
+    if not settings.GEMINI_API_KEY:
+        raise ValueError("GEMINI_API_KEY environment variable not set")
+    limits = {
+        "max_connections": settings.GEMINI_MAX_CONNECTIONS,
+        "max_keepalive_connections": settings.GEMINI_MAX_KEEPALIVE_CONNECTIONS,
+    }
+    return genai.Client(
+        api_key=settings.GEMINI_API_KEY,
+        http_options=types.HttpOptions(
+            # Milliseconds; applies to each connect/read/write, not the whole call
+            timeout=settings.GEMINI_TIMEOUT_SECONDS * 1000,
+            client_args={"limits": httpx.Limits(**limits)},
+            async_client_args={"limits": httpx.Limits(**limits)},
+            retry_options=types.HttpRetryOptions(
+                attempts=settings.GEMINI_RETRY_ATTEMPTS,
+                initial_delay=0.5,
+                max_delay=4.0,
+                http_status_codes=[408, 429, 500, 502, 503, 504],
+            ),
+        ),
+    )
+
+
+# Client instance for import
+gemini_client = create_gemini_client()
+
+# Caps in-flight LLM calls per process, so bursts queue here instead of
+# piling up 429s against the project quota
+llm_semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
@@ -5,7 +5,7 @@ Repository for Podcast database operations.
 import uuid
 import logging
 from typing import Optional
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models import Podcast
@@ -53,17 +53,20 @@ class PodcastRepository:
             await session.commit()
             await session.refresh(podcast)
             
-            logger.info(f"[REPO] Created podcast {podcast.id} for user {user_id}")
+            logger.info("[REPO] Created podcast %s for user %s", podcast.id, user_id)
             return podcast
     
-    async def list_by_user(
+    async def list_with_total_by_user(
         self,
         user_id: str,
         limit: int = 20,
         offset: int = 0,
-    ) -> list[Podcast]:
+    ) -> tuple[list[Podcast], int]:
         """
-        List podcasts for a specific user, ordered by creation date (newest first).
+        List a page of a user's podcasts together with their total count.
+        
+        The total comes from a COUNT(*) OVER() window in the same query, so a
+        page costs one round-trip instead of a list plus a count.
         
         Args:
             user_id: WSO2 user ID
@@ -71,19 +74,29 @@ class PodcastRepository:
             offset: Number of results to skip
             
         Returns:
-            List of Podcast instances
+            Tuple of (podcasts, total number of podcasts for the user)
         """
         async with async_session_maker() as session:
             result = await session.execute(
-                select(Podcast)
+                select(Podcast, func.count().over().label("total"))
                 .where(Podcast.user_id == user_id)
                 .order_by(Podcast.created_at.desc())
                 .limit(limit)
                 .offset(offset)
             )
-            podcasts = result.scalars().all()
-            logger.debug(f"[REPO] Found {len(podcasts)} podcasts for user {user_id}")
-            return list(podcasts)
+            rows = result.all()
+        
+        if rows:
+            total = rows[0].total
+        elif offset:
+            # Page past the end: the window has no row to report the total on
+            total = await self.count_by_user(user_id)
+        else:
+            total = 0
+        
+        podcasts = [row.Podcast for row in rows]
+        logger.debug("[REPO] Found %s of %s podcasts for user %s", len(podcasts), total, user_id)
+        return podcasts, total
     
     async def get_by_id(self, podcast_id: uuid.UUID) -> Optional[Podcast]:
         """
@@ -102,32 +115,36 @@ class PodcastRepository:
             podcast = result.scalar_one_or_none()
             return podcast
     
-    async def delete(self, podcast_id: uuid.UUID, user_id: str) -> bool:
+    async def delete(self, podcast_id: uuid.UUID, user_id: str) -> Optional[str]:
         """
         Delete a podcast by ID (only if owned by user).
         
+        Uses DELETE ... RETURNING, so the ownership check, the delete and the
+        audio path lookup take a single round-trip.
+        
         Args:
             podcast_id: Podcast UUID
             user_id: Owner's user ID (for authorization)
             
         Returns:
-            True if deleted, False if not found or not authorized
+            The deleted podcast's audio_path, or None if not found or not authorized
         """
         async with async_session_maker() as session:
             result = await session.execute(
                 delete(Podcast)
                 .where(Podcast.id == podcast_id)
                 .where(Podcast.user_id == user_id)
+                .returning(Podcast.audio_path)
             )
+            audio_path = result.scalar_one_or_none()
             await session.commit()
             
-            deleted = result.rowcount > 0
-            if deleted:
-                logger.info(f"[REPO] Deleted podcast {podcast_id}")
+            if audio_path is not None:
+                logger.info("[REPO] Deleted podcast %s", podcast_id)
             else:
-                logger.warning(f"[REPO] Podcast {podcast_id} not found or not authorized")
+                logger.warning("[REPO] Podcast %s not found or not authorized", podcast_id)
             
-            return deleted
+            return audio_path
     
     async def count_by_user(self, user_id: str) -> int:
         """
@@ -140,7 +157,6 @@ class PodcastRepository:
             Number of podcasts
         """
         async with async_session_maker() as session:
-            from sqlalchemy import func
             result = await session.execute(
                 select(func.count(Podcast.id)).where(Podcast.user_id == user_id)
             )
@@ -3,23 +3,31 @@ Podcast script generation service using Gemini LLM.
 Includes TTS markup tags and style instructions for enhanced audio quality.
 """
 
+import asyncio
 import logging
-from google import genai
+import re
+import time
+from functools import lru_cache
+from typing import Optional
+from google.genai import types
 from fastapi import HTTPException
 
 from app.core.config import settings
+from app.services.gemini_client import gemini_client, llm_semaphore
+from app.utils.cache import SingleFlight, TTLCache, make_cache_key
 
 logger = logging.getLogger(__name__)
 
 
-SCRIPT_GENERATOR_PROMPT = """Você é um roteirista especializado em criar scripts de podcast em português brasileiro, otimizados para síntese de voz (TTS).
+# Static instructions, identical on every call: sent as system_instruction so the
+# request prefix is stable and eligible for Gemini's implicit prefix caching
+SCRIPT_SYSTEM_PROMPT = """Você é um roteirista especializado em criar scripts de podcast em português brasileiro, otimizados para síntese de voz (TTS).
 
-Seu objetivo é criar um diálogo natural e envolvente entre {num_hosts} participante(s) discutindo o tema fornecido pelo usuário.
+Seu objetivo é criar um diálogo natural e envolvente entre o número de participantes indicado nos parâmetros, discutindo o tema fornecido pelo usuário.
 
 ## REGRAS DE FORMATO:
-1. O script deve ter aproximadamente {duracao} minutos de duração quando lido em voz alta
-2. Use o formato EXATO:
-{speakers_format}
+1. O script deve ter aproximadamente a duração indicada nos parâmetros quando lido em voz alta
+2. Use EXATAMENTE o formato de falas indicado nos parâmetros
 3. NÃO use nomes, apenas "Speaker 1", "Speaker 2"
 4. Escreva em português brasileiro natural e coloquial
 
@@ -66,7 +74,15 @@ Use estas tags entre colchetes para enriquecer a experiência auditiva:
 Speaker 1: Olá pessoal! [short pause] Bem-vindos a mais um episódio do nosso podcast.
 Speaker 2: Hoje vamos falar sobre um tema que [uhm] todo mundo quer saber...
 Speaker 1: [laughing] É verdade! [medium pause] Então vamos direto ao ponto.
-Speaker 2: [sigh] Olha, esse assunto é complexo, mas vou tentar explicar de forma simples.
+Speaker 2: [sigh] Olha, esse assunto é complexo, mas vou tentar explicar de forma simples."""
+
+
+# Per-request part of the prompt, kept last
+SCRIPT_GENERATOR_PROMPT = """## PARÂMETROS:
+- Participantes: {num_hosts}
+- Duração: aproximadamente {duracao} minutos
+- Formato das falas:
+{speakers_format}
 
 ## TEMA DO PODCAST:
 {tema}
@@ -74,6 +90,10 @@ Speaker 2: [sigh] Olha, esse assunto é complexo, mas vou tentar explicar de for
 ## SCRIPT:"""
 
 
+_PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+
+
+@lru_cache(maxsize=16)
 def build_speakers_format(num_hosts: int) -> str:
     """
     Generates the speakers format for the prompt.
@@ -90,17 +110,94 @@ def build_speakers_format(num_hosts: int) -> str:
     return "\n".join(lines)
 
 
+@lru_cache(maxsize=32)
+def build_prompt_template(num_hosts: int) -> tuple[str, ...]:
+    """
+    Specializes SCRIPT_GENERATOR_PROMPT for a number of hosts.
+    
+    Only a handful of host counts are used, so the speakers format is built
+    once per count and the template is pre-split around the fields left, so
+    each request is a single join instead of a str.format parse.
+    
+    Args:
+        num_hosts: Number of hosts/speakers
+        
+    Returns:
+        Alternating literal and field-name pieces ({tema} and {duracao}),
+        field names at the odd indexes
+    """
+    template = (
+        SCRIPT_GENERATOR_PROMPT
+        .replace("{num_hosts}", str(num_hosts))
+        .replace("{speakers_format}", build_speakers_format(num_hosts))
+    )
+    return tuple(_PLACEHOLDER_RE.split(template))
+
+
+def render_prompt(num_hosts: int, duracao_minutos: int, tema: str) -> str:
+    """
+    Builds the per-request script prompt.
+    
+    Args:
+        num_hosts: Number of hosts/speakers
+        duracao_minutos: Approximate desired duration in minutes
+        tema: The theme or base content for the podcast
+        
+    Returns:
+        Prompt text sent as the request contents
+    """
+    fields = {"duracao": str(duracao_minutos), "tema": tema}
+    return "".join(
+        fields[piece] if i % 2 else piece
+        for i, piece in enumerate(build_prompt_template(num_hosts))
+    )
+
+
+# Header placed before the text extracted from uploaded documents
+REFERENCE_HEADER = "## Material de Referência:"
+
+# Gemini rejects context caches under a model-dependent minimum (~1-4k tokens)
+_MIN_DOCUMENT_CACHE_CHARS = 8192
+# Lowest of those minimums (Gemini 2.5 Flash); models with a higher one still
+# fail at creation and back off
+_MIN_CONTEXT_CACHE_TOKENS = 1024
+
+
 class ScriptService:
     """Service for generating podcast scripts using LLM."""
     
     def __init__(self):
-        self.client = genai.Client(api_key=settings.GEMINI_API_KEY)
+        self.client = gemini_client
+        # Exact-match cache: previews often repeat (tema, duração, hosts)
+        self._cache: TTLCache[str] = TTLCache(
+            maxsize=settings.LLM_CACHE_MAXSIZE,
+            ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+        )
+        # Identical requests arriving together share one Gemini call
+        self._inflight: SingleFlight[str] = SingleFlight()
+        # Explicit context cache holding SCRIPT_SYSTEM_PROMPT (opt-in)
+        self._context_cache_name: Optional[str] = None
+        self._context_cache_expires = 0.0
+        self._context_cache_lock = asyncio.Lock()
+        self._context_cache_checked = False
+        self._context_cache_disabled = False
+        # Context caches holding uploaded documents, by content hash (opt-in);
+        # "" records a recent creation failure
+        document_cache_ttl = settings.DOCUMENT_CONTEXT_CACHE_TTL_SECONDS
+        self._document_caches: TTLCache[str] = TTLCache(
+            maxsize=256,
+            # Forget handles a minute early so no request references an expired cache
+            ttl_seconds=max(document_cache_ttl - 60, document_cache_ttl / 2),
+        )
+        self._document_inflight: SingleFlight[Optional[str]] = SingleFlight()
     
     async def generate_script(
         self, 
         tema: str, 
         duracao_minutos: int = 3, 
-        num_hosts: int = 2
+        num_hosts: int = 2,
+        use_cache: bool = True,
+        referencia: str = "",
     ) -> str:
         """
         Uses Gemini 2.5 Flash to generate podcast script with TTS markup tags.
@@ -109,39 +206,216 @@ class ScriptService:
             tema: The theme or base content for the podcast
             duracao_minutos: Approximate desired duration in minutes
             num_hosts: Number of hosts/participants
+            use_cache: False skips the cache lookup and always calls Gemini
+                (the fresh script still replaces the cached one)
+            referencia: Text extracted from uploaded documents, if any
             
         Returns:
             Formatted script with Speaker 1, Speaker 2, and TTS markup tags
         """
-        logger.info(f"[SCRIPT] Iniciando geração de script - Tema: {tema[:100]}..., Duração: {duracao_minutos} min, Hosts: {num_hosts}")
+        logger.info("[SCRIPT] Iniciando geração de script - Tema: %s..., Duração: %s min, Hosts: %s", tema[:100], duracao_minutos, num_hosts)
+        
+        tema_completo = f"{tema}\n\n{REFERENCE_HEADER}{referencia}" if referencia else tema
+        prompt = render_prompt(num_hosts, duracao_minutos, tema_completo)
+        logger.debug("[SCRIPT] Prompt formatado, tamanho: %s chars", len(prompt))
+        
+        # Large documents can be sent once as a context cache; the request then
+        # only carries the parameters and the theme
+        reference_prompt = None
+        if (
+            settings.DOCUMENT_CONTEXT_CACHE_TTL_SECONDS > 0
+            and len(referencia) >= _MIN_DOCUMENT_CACHE_CHARS
+        ):
+            reference_prompt = (referencia, render_prompt(num_hosts, duracao_minutos, tema))
+        
+        if not settings.CACHE_SCRIPTS:
+            return await self._generate(None, prompt, reference_prompt)
+        
+        # Keyed on the exact prompt sent, so template changes never serve stale scripts
+        cache_key = make_cache_key("script", settings.LLM_MODEL, prompt)
+        if not use_cache:
+            return await self._generate(cache_key, prompt, reference_prompt)
+        
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            logger.info("[SCRIPT] Cache hit, tamanho: %s chars", len(cached))
+            return cached
+        
+        return await self._inflight.run(
+            cache_key,
+            lambda: self._generate(cache_key, prompt, reference_prompt),
+        )
+    
+    async def _get_context_cache(self) -> Optional[str]:
+        """
+        Returns the name of the Gemini context cache holding the system prompt.
+        
+        The cache is created on first use and recreated shortly before its TTL
+        runs out. The prompt's size is checked once: under the minimum
+        cacheable size the cache is disabled for the process. If creation
+        fails anyway, calls fall back to the inline system prompt and
+        creation is retried a minute later.
         
+        Returns:
+            Cached content name, or None to send the system prompt inline
+        """
+        ttl = settings.SCRIPT_CONTEXT_CACHE_TTL_SECONDS
+        if ttl <= 0 or self._context_cache_disabled:
+            return None
+        if time.monotonic() < self._context_cache_expires:
+            return self._context_cache_name
+        
+        async with self._context_cache_lock:
+            now = time.monotonic()
+            if now < self._context_cache_expires:
+                return self._context_cache_name
+            if self._context_cache_disabled or not await self._context_cache_fits():
+                return None
+            try:
+                cache = await self.client.aio.caches.create(
+                    model=settings.LLM_MODEL,
+                    config=types.CreateCachedContentConfig(
+                        display_name="podcast-script-system-prompt",
+                        system_instruction=SCRIPT_SYSTEM_PROMPT,
+                        ttl=f"{ttl}s",
+                    ),
+                )
+            except Exception as e:
+                logger.warning("[SCRIPT] Falha ao criar context cache, usando prompt inline: %s", e)
+                self._context_cache_name = None
+                self._context_cache_expires = now + 60
+                return None
+            
+            logger.info("[SCRIPT] Context cache criado: %s", cache.name)
+            self._context_cache_name = cache.name
+            # Renew early so no request references a cache about to expire
+            self._context_cache_expires = now + max(ttl - 60, ttl / 2)
+            return cache.name
+    
+    async def _context_cache_fits(self) -> bool:
+        """
+        Counts SCRIPT_SYSTEM_PROMPT's tokens on the first call.
+        
+        Returns:
+            False (and disables the context cache) if the prompt is under
+            the minimum cacheable size; True otherwise, or if counting failed
+        """
+        if self._context_cache_checked:
+            return True
         try:
-            speakers_format = build_speakers_format(num_hosts)
-            prompt = SCRIPT_GENERATOR_PROMPT.format(
-                duracao=duracao_minutos,
-                tema=tema,
-                num_hosts=num_hosts,
-                speakers_format=speakers_format
+            response = await self.client.aio.models.count_tokens(
+                model=settings.LLM_MODEL, contents=SCRIPT_SYSTEM_PROMPT
             )
-            logger.debug(f"[SCRIPT] Prompt formatado, tamanho: {len(prompt)} chars")
-            
-            response = self.client.models.generate_content(
+        except Exception as e:
+            logger.warning("[SCRIPT] Falha ao contar tokens do prompt de sistema: %s", e)
+            return True
+        self._context_cache_checked = True
+        if (response.total_tokens or 0) < _MIN_CONTEXT_CACHE_TOKENS:
+            logger.info(
+                "[SCRIPT] Prompt de sistema com %s tokens, abaixo do mínimo de %s para context cache; "
+                "SCRIPT_CONTEXT_CACHE_TTL_SECONDS ignorado",
+                response.total_tokens, _MIN_CONTEXT_CACHE_TOKENS,
+            )
+            self._context_cache_disabled = True
+            return False
+        return True
+    
+    async def _get_document_cache(self, referencia: str) -> Optional[str]:
+        """
+        Returns the name of a Gemini context cache holding the given documents.
+        
+        The cache also carries SCRIPT_SYSTEM_PROMPT, since a request that uses
+        cached content cannot add its own system instruction. Requests with
+        the same documents (e.g. trying another duration or host count) reuse
+        it until its TTL runs out. A failed creation is remembered for a
+        minute, during which the documents are sent inline without retrying.
+        
+        Returns:
+            Cached content name, or None to send the documents inline
+        """
+        key = make_cache_key("document-context", settings.LLM_MODEL, referencia)
+        name = self._document_caches.get(key)
+        if name is not None:
+            return name or None
+        return await self._document_inflight.run(
+            key, lambda: self._create_document_cache(key, referencia)
+        )
+    
+    async def _create_document_cache(self, key: str, referencia: str) -> Optional[str]:
+        """Creates the context cache for a set of documents; None if it failed."""
+        try:
+            cache = await self.client.aio.caches.create(
                 model=settings.LLM_MODEL,
-                contents=prompt
+                config=types.CreateCachedContentConfig(
+                    display_name="podcast-script-documents",
+                    system_instruction=SCRIPT_SYSTEM_PROMPT,
+                    contents=[f"{REFERENCE_HEADER}{referencia}"],
+                    ttl=f"{settings.DOCUMENT_CONTEXT_CACHE_TTL_SECONDS}s",
+                ),
             )
+        except Exception as e:
+            logger.warning("[SCRIPT] Falha ao criar context cache dos documentos, enviando inline: %s", e)
+            # "" marks the failure, so the same documents back off like _get_context_cache
+            self._document_caches.set(key, "", ttl_seconds=60)
+            return None
+        
+        logger.info("[SCRIPT] Context cache de documentos criado: %s", cache.name)
+        self._document_caches.set(key, cache.name)
+        return cache.name
+    
+    async def _generate(
+        self,
+        cache_key: Optional[str],
+        prompt: str,
+        reference_prompt: Optional[tuple[str, str]] = None,
+    ) -> str:
+        """
+        Calls Gemini for a script, storing the result under cache_key if given.
+        
+        Args:
+            cache_key: Script cache key, or None to skip storing the result
+            prompt: Full prompt, documents included
+            reference_prompt: (documents, prompt without them) to try the
+                document context cache with
+        """
+        try:
+            config = None
+            if reference_prompt is not None:
+                referencia, short_prompt = reference_prompt
+                document_cache = await self._get_document_cache(referencia)
+                if document_cache:
+                    prompt = short_prompt
+                    config = types.GenerateContentConfig(cached_content=document_cache)
+            
+            if config is None:
+                cached_content = await self._get_context_cache()
+                if cached_content:
+                    config = types.GenerateContentConfig(cached_content=cached_content)
+                else:
+                    config = types.GenerateContentConfig(system_instruction=SCRIPT_SYSTEM_PROMPT)
+            
+            async with llm_semaphore:
+                # Native async client: no worker thread held for the round-trip
+                response = await self.client.aio.models.generate_content(
+                    model=settings.LLM_MODEL,
+                    contents=prompt,
+                    config=config,
+                )
             logger.debug("[SCRIPT] Resposta recebida do Gemini")
             
             if not response.text:
                 logger.error("[SCRIPT] Resposta vazia do Gemini")
                 raise HTTPException(status_code=500, detail="Falha ao gerar script do podcast")
             
-            logger.info(f"[SCRIPT] Script gerado com sucesso, tamanho: {len(response.text)} chars")
+            logger.info("[SCRIPT] Script gerado com sucesso, tamanho: %s chars", len(response.text))
+            if cache_key is not None:
+                self._cache.set(cache_key, response.text)
             return response.text
             
         except HTTPException:
             raise
         except Exception as e:
-            logger.exception(f"[SCRIPT] Erro ao gerar script: {e}")
+            logger.exception("[SCRIPT] Erro ao gerar script: %s", e)
             raise HTTPException(status_code=500, detail=f"Erro ao gerar script: {str(e)}")
 
 
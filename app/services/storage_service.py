@@ -2,11 +2,23 @@
 GCP Cloud Storage service for audio file management.
 """
 
+import contextlib
+import io
 import os
+import tempfile
+import threading
+import time
 import uuid
 import logging
 from datetime import timedelta
+from functools import lru_cache
+from typing import BinaryIO, Iterable, Union
+import google.auth
+from google.auth.transport import requests as auth_requests
 from google.cloud import storage
+from google.cloud.storage import transfer_manager
+
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -14,10 +26,22 @@ logger = logging.getLogger(__name__)
 class StorageService:
     """Service for uploading and managing audio files in GCS."""
     
-    def __init__(self):
+    def __init__(self, lazy: bool = True):
+        """
+        Args:
+            lazy: Defer creating the GCS client and bucket until first use.
+                When False they are bound here, so missing configuration or
+                credentials fail at startup instead of on the first upload.
+        """
         self._client = None
         self._bucket = None
-        self._bucket_name = os.getenv("BUCKET_AUDIOS", "")
+        self._bucket_name = settings.BUCKET_AUDIOS
+        # Signing credentials, shared by the threads that sign URLs
+        self._credentials = None
+        self._auth_request = None
+        self._credentials_lock = threading.Lock()
+        if not lazy:
+            self._bucket = self.bucket
     
     @property
     def client(self) -> storage.Client:
@@ -34,44 +58,144 @@ class StorageService:
             if not self._bucket_name:
                 raise ValueError("BUCKET_AUDIOS environment variable not set")
             self._bucket = self.client.bucket(self._bucket_name)
-            logger.info(f"[STORAGE] Using bucket: {self._bucket_name}")
+            logger.info("[STORAGE] Using bucket: %s", self._bucket_name)
         return self._bucket
     
-    def upload_audio(self, audio_bytes: bytes, user_id: str, filename: str = None) -> tuple[str, str]:
+    def build_audio_location(self, user_id: str, filename: str = None) -> tuple[str, str]:
         """
-        Upload audio file to GCS bucket.
+        Computes where an audio file will be stored, without uploading it.
         
         Args:
-            audio_bytes: The audio data in bytes
             user_id: User ID for organizing files
-            filename: Optional custom filename
+            filename: Optional custom filename (random UUID .wav if omitted)
             
         Returns:
-            Tuple of (public_url, blob_path) for storage
+            Tuple of (public_url, blob_path)
         """
         if filename is None:
             filename = f"{uuid.uuid4()}.wav"
         
         # Organize by user_id/filename
         blob_path = f"podcasts/{user_id}/{filename}"
+        public_url = f"https://storage.googleapis.com/{self._bucket_name}/{blob_path}"
+        return public_url, blob_path
+    
+    def upload_audio(
+        self,
+        audio: Union[bytes, BinaryIO],
+        user_id: str,
+        filename: str = None,
+        content_type: str = "audio/wav",
+    ) -> tuple[str, str]:
+        """
+        Upload audio file to GCS bucket.
         
-        blob = self.bucket.blob(blob_path)
-        blob.upload_from_string(
-            audio_bytes,
-            content_type="audio/wav",
-        )
+        In-memory payloads of at least GCS_PARALLEL_UPLOAD_THRESHOLD are sent
+        as GCS_UPLOAD_CHUNK_SIZE parts over parallel connections. Other payloads
+        over 8 MiB (or of unknown size) go through a resumable upload sent
+        GCS_UPLOAD_CHUNK_SIZE bytes at a time, instead of one multipart request
+        body holding a second copy of the audio.
+        
+        Args:
+            audio: The audio data, as bytes or a binary file object
+            user_id: User ID for organizing files
+            filename: Optional custom filename
+            content_type: MIME type stored with the object
+            
+        Returns:
+            Tuple of (public_url, blob_path) for storage
+        """
+        public_url, blob_path = self.build_audio_location(user_id, filename)
+        blob = self.bucket.blob(blob_path, chunk_size=settings.GCS_UPLOAD_CHUNK_SIZE)
         
-        logger.info(f"[STORAGE] Uploaded audio to gs://{self._bucket_name}/{blob_path}")
+        if isinstance(audio, (bytes, bytearray, memoryview)):
+            if (
+                settings.GCS_UPLOAD_MAX_WORKERS > 1
+                and len(audio) >= settings.GCS_PARALLEL_UPLOAD_THRESHOLD
+            ):
+                self._upload_parallel(audio, blob, content_type)
+            else:
+                # BytesIO over bytes shares the buffer, nothing is copied
+                blob.upload_from_file(io.BytesIO(audio), size=len(audio), content_type=content_type)
+        else:
+            blob.upload_from_file(audio, size=None, content_type=content_type)
+        
+        logger.info("[STORAGE] Uploaded audio to gs://%s/%s", self._bucket_name, blob_path)
         
         # Return both the public URL and the path for signed URL generation
-        public_url = f"https://storage.googleapis.com/{self._bucket_name}/{blob_path}"
+        return public_url, blob_path
+    
+    def _upload_parallel(
+        self,
+        audio: Union[bytes, bytearray, memoryview],
+        blob: storage.Blob,
+        content_type: str,
+    ) -> None:
+        """Sends audio as an XML multipart upload with concurrent part PUTs."""
+        # The transfer manager reads each part from a file, so spool the payload once
+        with tempfile.NamedTemporaryFile(suffix=".upload", delete=False) as tmp:
+            tmp.write(audio)
+        try:
+            transfer_manager.upload_chunks_concurrently(
+                tmp.name,
+                blob,
+                content_type=content_type,
+                chunk_size=settings.GCS_UPLOAD_CHUNK_SIZE,
+                max_workers=settings.GCS_UPLOAD_MAX_WORKERS,
+                # Threads share the client; processes would rebuild it per part
+                worker_type=transfer_manager.THREAD,
+            )
+        finally:
+            os.unlink(tmp.name)
+    
+    def upload_audio_chunks(
+        self,
+        chunks: Iterable[bytes],
+        user_id: str,
+        filename: str = None,
+        content_type: str = "audio/wav",
+    ) -> tuple[str, str]:
+        """
+        Upload audio to GCS while it is still being produced.
+        
+        Data goes through a resumable upload, one GCS_UPLOAD_CHUNK_SIZE part at
+        a time, as the chunks arrive. If the iterator raises, the partial object
+        is deleted and the error re-raised.
+        
+        Args:
+            chunks: Audio data chunks, in order
+            user_id: User ID for organizing files
+            filename: Optional custom filename
+            content_type: MIME type stored with the object
+            
+        Returns:
+            Tuple of (public_url, blob_path) for storage
+        """
+        public_url, blob_path = self.build_audio_location(user_id, filename)
+        
+        blob = self.bucket.blob(blob_path, chunk_size=settings.GCS_UPLOAD_CHUNK_SIZE)
+        writer = blob.open("wb", content_type=content_type)
+        try:
+            for chunk in chunks:
+                writer.write(chunk)
+        except BaseException:
+            # Closing finalizes what was sent so far; remove it so no truncated audio remains
+            with contextlib.suppress(Exception):
+                writer.close()
+                blob.delete()
+            raise
+        writer.close()
+        
+        logger.info("[STORAGE] Uploaded audio to gs://%s/%s", self._bucket_name, blob_path)
         
         return public_url, blob_path
     
     def get_signed_url(self, blob_path: str, expiration_hours: int = 1) -> str:
         """
         Generate a signed URL for private bucket access.
-        Uses IAM signing for Cloud Run compatibility.
+        
+        URLs are reused for half of their validity: a cached URL is always
+        valid for at least expiration_hours / 2 when returned.
         
         Args:
             blob_path: Path to the blob in the bucket
@@ -80,30 +204,46 @@ class StorageService:
         Returns:
             Signed URL for accessing the audio file
         """
-        import google.auth
-        from google.auth import compute_engine
-        from google.auth.transport import requests
+        window_seconds = expiration_hours * 1800
+        window = int(time.time() // window_seconds)
+        return self._cached_signed_url(blob_path, expiration_hours, window)
+    
+    @lru_cache(maxsize=10000)
+    def _cached_signed_url(self, blob_path: str, expiration_hours: int, window: int) -> str:
+        """Signs once per (blob, expiration, time window); window only keys the cache."""
+        return self._sign_url(blob_path, expiration_hours)
+    
+    def _get_credentials(self):
+        """
+        Returns default credentials with a valid access token for signing.
         
+        The credentials are loaded once and refreshed only when the token is
+        about to expire, instead of a metadata-server round trip per URL.
+        """
+        with self._credentials_lock:
+            if self._credentials is None:
+                self._credentials, _ = google.auth.default()
+                self._auth_request = auth_requests.Request()
+            # valid is False for a missing token or one close to expiry
+            if not self._credentials.valid:
+                self._credentials.refresh(self._auth_request)
+                logger.debug("[STORAGE] Signing credentials refreshed")
+            return self._credentials
+    
+    def _sign_url(self, blob_path: str, expiration_hours: int) -> str:
+        """
+        Signs a GET URL for a blob.
+        Uses IAM signing for Cloud Run compatibility.
+        """
         blob = self.bucket.blob(blob_path)
         
-        # Get credentials and request object for IAM signing
-        auth_request = requests.Request()
-        credentials, project = google.auth.default()
-        
-        # Refresh credentials to get the service account email
-        credentials.refresh(auth_request)
+        credentials = self._get_credentials()
         
         # Get service account email from metadata
         service_account_email = getattr(credentials, 'service_account_email', None)
         
         if service_account_email:
             # Use IAM signing (works on Cloud Run)
-            signing_credentials = compute_engine.IDTokenCredentials(
-                auth_request,
-                target_audience="",
-                service_account_email=service_account_email,
-            )
-            
             url = blob.generate_signed_url(
                 version="v4",
                 expiration=timedelta(hours=expiration_hours),
@@ -119,7 +259,7 @@ class StorageService:
                 method="GET",
             )
         
-        logger.debug(f"[STORAGE] Generated signed URL for {blob_path}")
+        logger.debug("[STORAGE] Generated signed URL for %s", blob_path)
         return url
     
     def delete_audio(self, blob_path: str) -> bool:
@@ -135,12 +275,13 @@ class StorageService:
         try:
             blob = self.bucket.blob(blob_path)
             blob.delete()
-            logger.info(f"[STORAGE] Deleted audio: {blob_path}")
+            logger.info("[STORAGE] Deleted audio: %s", blob_path)
             return True
         except Exception as e:
-            logger.warning(f"[STORAGE] Failed to delete {blob_path}: {e}")
+            logger.warning("[STORAGE] Failed to delete %s: %s", blob_path, e)
             return False
 
 
-# Singleton instance
-storage_service = StorageService()
+# Singleton instance; bound at import when a bucket is configured, lazy for
+# local development without GCS
+storage_service = StorageService(lazy=not settings.BUCKET_AUDIOS)
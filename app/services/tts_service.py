@@ -2,21 +2,116 @@
 Text-to-Speech service using Gemini TTS.
 """
 
+import asyncio
 import logging
-import mimetypes
-from typing import List
+import re
+from functools import lru_cache
+from operator import attrgetter
+from typing import AsyncIterator, List
 
-from google import genai
 from google.genai import types
 from fastapi import HTTPException
 
 from app.core.config import settings
+from app.services.gemini_client import gemini_client
 from app.models.schemas import HostVoice
-from app.models.voices import VOZES_DISPONIVEIS, get_default_voice_configs
-from app.utils.audio import convert_to_wav
+from app.models.voices import FALLBACK_VOICE, VOZES_DISPONIVEIS, get_default_voice_configs
+from app.utils.audio import AudioEncoder, build_wav_header, parse_audio_mime_type
 
 logger = logging.getLogger(__name__)
 
+# Speaker turns start at the beginning of a line
+_TURN_SPLIT_RE = re.compile(r"\n+(?=Speaker \d+:)")
+_TURN_SPEAKER_RE = re.compile(r"Speaker (\d+):")
+
+_host_number = attrgetter("hostNumber")
+
+# Gemini multi-speaker TTS accepts exactly this many voices per request
+MAX_SPEAKERS_PER_REQUEST = 2
+
+# Bounds the later segments of long scripts synthesized while the first one streams
+_segment_semaphore = asyncio.Semaphore(max(1, settings.TTS_MAX_PARALLEL_SEGMENTS))
+
+
+# Raw PCM MIME prefixes ("audio/L16;rate=24000"), which need a WAV header
+_RAW_AUDIO_MIMES = ("audio/L",)
+
+
+def split_script(script: str, max_chars: int) -> List[str]:
+    """
+    Splits a script into segments of whole speaker turns.
+    
+    Args:
+        script: Formatted script with Speaker 1, Speaker 2, ..., Speaker N
+        max_chars: Target segment size; a single longer turn stays whole
+        
+    Returns:
+        Segments in script order (the whole script if max_chars <= 0)
+    """
+    if max_chars <= 0 or len(script) <= max_chars:
+        return [script]
+    
+    segments: List[str] = []
+    current: List[str] = []
+    current_len = 0
+    for turn in _TURN_SPLIT_RE.split(script.strip()):
+        if current and current_len + len(turn) > max_chars:
+            segments.append("\n".join(current))
+            current, current_len = [], 0
+        current.append(turn)
+        current_len += len(turn) + 1
+    if current:
+        segments.append("\n".join(current))
+    return segments
+
+
+def split_speaker_groups(script: str) -> List[tuple[str, frozenset[int]]]:
+    """
+    Splits a script into runs of consecutive turns with at most two speakers.
+    
+    Each run can be synthesized by one multi-speaker TTS request with the
+    right voices, so podcasts with more than two hosts keep every voice.
+    
+    Args:
+        script: Formatted script with Speaker 1, Speaker 2, ..., Speaker N
+        
+    Returns:
+        (segment text, speaker numbers in it) tuples, in script order
+    """
+    groups: List[tuple[str, frozenset[int]]] = []
+    current: List[str] = []
+    speakers: set[int] = set()
+    for turn in _TURN_SPLIT_RE.split(script.strip()):
+        match = _TURN_SPEAKER_RE.match(turn)
+        speaker = int(match.group(1)) if match else None
+        if speaker is not None and speaker not in speakers and len(speakers) == MAX_SPEAKERS_PER_REQUEST:
+            groups.append(("\n".join(current), frozenset(speakers)))
+            current, speakers = [], set()
+        current.append(turn)
+        if speaker is not None:
+            speakers.add(speaker)
+    if current:
+        groups.append(("\n".join(current), frozenset(speakers)))
+    return groups
+
+
+@lru_cache(maxsize=256)
+def _speaker_voice_config(speaker: str, voice_name: str) -> types.SpeakerVoiceConfig:
+    """
+    Returns the shared SpeakerVoiceConfig for a speaker label and voice.
+    
+    The configs are cached instead of rebuilt (three Pydantic models) per
+    request; callers must not mutate them.
+    """
+    return types.SpeakerVoiceConfig(
+        speaker=speaker,
+        voice_config=types.VoiceConfig(
+            prebuilt_voice_config=types.PrebuiltVoiceConfig(
+                voice_name=voice_name
+            )
+        ),
+    )
+
 
 def build_speaker_voice_configs(hosts_vozes: List[HostVoice]) -> List[types.SpeakerVoiceConfig]:
     """
@@ -28,76 +123,215 @@ def build_speaker_voice_configs(hosts_vozes: List[HostVoice]) -> List[types.Spea
     Returns:
         List of SpeakerVoiceConfig for Gemini TTS
     """
-    configs = []
-    for hv in sorted(hosts_vozes, key=lambda x: x.hostNumber):
+    return [
         # Validate if voice exists
-        voice_name = hv.vozId if hv.vozId in VOZES_DISPONIVEIS else "Zephyr"
-        configs.append(
-            types.SpeakerVoiceConfig(
-                speaker=f"Speaker {hv.hostNumber}",
-                voice_config=types.VoiceConfig(
-                    prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                        voice_name=voice_name
-                    )
-                ),
-            )
+        _speaker_voice_config(
+            f"Speaker {hv.hostNumber}",
+            hv.vozId if hv.vozId in VOZES_DISPONIVEIS else FALLBACK_VOICE,
         )
-    return configs
+        for hv in sorted(hosts_vozes, key=_host_number)
+    ]
 
 
 class TTSService:
     """Service for converting text to speech using Gemini TTS."""
     
     def __init__(self):
-        self.client = genai.Client(api_key=settings.GEMINI_API_KEY)
+        self.client = gemini_client
+    
+    async def warmup(self) -> None:
+        """
+        Opens the HTTP connection to Gemini ahead of the TTS call.
+        
+        Fetches the TTS model metadata, which is cheap and needs no audio quota.
+        Failures are only logged: the real request will surface any error.
+        """
+        try:
+            await self.client.aio.models.get(model=settings.TTS_MODEL)
+            logger.debug("[TTS] Conexão aquecida")
+        except Exception as e:
+            logger.warning("[TTS] Falha no warmup: %s", e)
     
-    def generate_audio(self, script: str, hosts_vozes: List[HostVoice]) -> bytes:
+    async def stream_audio(
+        self, script: str, hosts_vozes: List[HostVoice], audio_format: str = "wav"
+    ) -> AsyncIterator[bytes]:
         """
-        Converts podcast script to WAV audio using Gemini TTS.
+        Converts podcast script to audio, yielding chunks as Gemini returns them.
+        
+        The first chunk is fetched before returning, so generation errors surface
+        as HTTPException before a streaming response has started.
         
         Args:
             script: Formatted script with Speaker 1, Speaker 2, ..., Speaker N
             hosts_vozes: Voice configuration per host
+            audio_format: "wav", "flac" or "opus" (see app.utils.audio.AUDIO_FORMATS)
             
         Returns:
-            WAV audio in bytes
+            Async iterator over audio chunks
         """
-        logger.info(f"[TTS] Iniciando geração de áudio, script tem {len(script)} chars, {len(hosts_vozes)} hosts")
+        chunks = self._iter_audio_chunks(script, hosts_vozes, audio_format)
+        first_chunk = await anext(chunks)
+        return self._drain_chunks(first_chunk, chunks)
+    
+    async def _drain_chunks(self, first_chunk: bytes, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """Yields the already fetched first chunk, then the rest of the stream."""
+        try:
+            yield first_chunk
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            # Client went away: cancel pending segments now, not at garbage collection
+            await chunks.aclose()
+    
+    async def _iter_audio_chunks(
+        self, script: str, hosts_vozes: List[HostVoice], audio_format: str = "wav"
+    ) -> AsyncIterator[bytes]:
+        """
+        Streams the podcast script through Gemini TTS in the requested format.
+        
+        Args:
+            script: Formatted script with Speaker 1, Speaker 2, ..., Speaker N
+            hosts_vozes: Voice configuration per host
+            audio_format: "wav", "flac" or "opus"
+            
+        Yields:
+            Audio chunks (the first one carries the file header)
+        """
+        pcm_chunks = self._iter_segmented_pcm_chunks(script, hosts_vozes)
+        
+        if audio_format == "wav":
+            first = True
+            async for data, mime_type in pcm_chunks:
+                # Raw PCM gets one header for the whole stream; its sizes are
+                # unknown yet, buffered callers fix them with finalize_wav_header.
+                # Gemini sends one MIME type per stream, so only the first is checked
+                if first:
+                    first = False
+                    if mime_type.startswith(_RAW_AUDIO_MIMES):
+                        parameters = parse_audio_mime_type(mime_type)
+                        data = build_wav_header(None, parameters["rate"], parameters["bits_per_sample"]) + data
+                yield data
+            return
+        
+        encoder = None
+        try:
+            async for data, mime_type in pcm_chunks:
+                # Gemini returns 16-bit mono PCM; the rate comes from the MIME type
+                if encoder is None:
+                    encoder = AudioEncoder(
+                        audio_format,
+                        parse_audio_mime_type(mime_type)["rate"],
+                        settings.AUDIO_OPUS_BITRATE,
+                    )
+                if encoded := encoder.encode(data):
+                    yield encoded
+            
+            if encoder is not None:
+                yield encoder.finish()
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception("[TTS] Erro ao codificar áudio em %s: %s", audio_format, e)
+            raise HTTPException(status_code=500, detail=f"Erro ao codificar áudio: {str(e)}")
+    
+    async def _iter_segmented_pcm_chunks(
+        self, script: str, hosts_vozes: List[HostVoice]
+    ) -> AsyncIterator[tuple[bytes, str]]:
+        """
+        Synthesizes long scripts as parallel segments, yielding audio in order.
         
+        The first segment streams directly; the others are synthesized
+        meanwhile as background tasks (at most TTS_MAX_PARALLEL_SEGMENTS per
+        process), so total latency tracks the longest segment instead of the
+        whole script. Scripts shorter than
+        TTS_SEGMENT_CHARS (or with it set to 0) use a single request, unless
+        they have more than two hosts: those are split into runs of at most
+        two speakers, the limit of a multi-speaker request.
+        
+        Yields:
+            Tuples of (raw audio data, MIME type), in script order
+        """
+        if len(hosts_vozes) > MAX_SPEAKERS_PER_REQUEST:
+            # One request per run of two speakers, each with its own voices
+            jobs = [
+                (segment, [hv for hv in hosts_vozes if hv.hostNumber in speakers])
+                for text, speakers in split_speaker_groups(script)
+                for segment in split_script(text, settings.TTS_SEGMENT_CHARS)
+            ]
+        else:
+            jobs = [(segment, hosts_vozes) for segment in split_script(script, settings.TTS_SEGMENT_CHARS)]
+        
+        if len(jobs) == 1:
+            async for item in self._iter_pcm_chunks(*jobs[0]):
+                yield item
+            return
+        
+        logger.info("[TTS] Script dividido em %s segmentos paralelos", len(jobs))
+        tasks = [asyncio.create_task(self._collect_segment(*job)) for job in jobs[1:]]
+        for task in tasks:
+            # Failures after an earlier one are never awaited, mark them retrieved
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        try:
+            async for item in self._iter_pcm_chunks(*jobs[0]):
+                yield item
+            for task in tasks:
+                for item in await task:
+                    yield item
+        finally:
+            # Client went away or a segment failed: stop the remaining work
+            for task in tasks:
+                task.cancel()
+    
+    async def _collect_segment(self, script: str, hosts_vozes: List[HostVoice]) -> List[tuple[bytes, str]]:
+        """Synthesizes a background segment, buffering it until its turn to play."""
+        async with _segment_semaphore:
+            return [item async for item in self._iter_pcm_chunks(script, hosts_vozes)]
+    
+    async def _iter_pcm_chunks(self, script: str, hosts_vozes: List[HostVoice]) -> AsyncIterator[tuple[bytes, str]]:
+        """
+        Streams the podcast script through Gemini TTS.
+        
+        Args:
+            script: Formatted script with Speaker 1, Speaker 2, ..., Speaker N
+            hosts_vozes: Voice configuration per host
+            
+        Yields:
+            Tuples of (raw audio data, MIME type) as returned by Gemini
+        """
+        logger.info("[TTS] Iniciando geração de áudio, script tem %s chars, %s hosts", len(script), len(hosts_vozes))
+        
+        # Checked once: the per-chunk debug logs are skipped entirely at INFO
+        debug = logger.isEnabledFor(logging.DEBUG)
         try:
-            logger.debug(f"[TTS] Usando modelo: {settings.TTS_MODEL}")
+            logger.debug("[TTS] Usando modelo: %s", settings.TTS_MODEL)
             
             # Build voice configuration dynamically
-            # NOTE: Gemini TTS multi-speaker API only supports exactly 2 speakers
+            # NOTE: Gemini TTS multi-speaker API only supports exactly 2 speakers;
+            # scripts with more hosts arrive here already split into runs of 2
             speaker_configs = build_speaker_voice_configs(hosts_vozes)
             
-            if len(speaker_configs) != 2:
-                logger.warning(f"[TTS] Gemini TTS requer exatamente 2 speakers, ajustando de {len(speaker_configs)} para 2")
-                # Take first 2 or pad to 2
-                if len(speaker_configs) > 2:
-                    speaker_configs = speaker_configs[:2]
-                elif len(speaker_configs) < 2:
-                    # Add default second speaker if only 1
-                    default_voices = get_default_voice_configs(2)
-                    while len(speaker_configs) < 2:
-                        idx = len(speaker_configs)
-                        speaker_configs.append(
-                            types.SpeakerVoiceConfig(
-                                speaker=f"Speaker {idx + 1}",
-                                voice_config=types.VoiceConfig(
-                                    prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                                        voice_name=default_voices[idx].vozId
-                                    )
-                                ),
-                            )
-                        )
-            
-            logger.debug(f"[TTS] Configuração de vozes: {[(s.speaker, s.voice_config.prebuilt_voice_config.voice_name) for s in speaker_configs]}")
+            if len(speaker_configs) > MAX_SPEAKERS_PER_REQUEST:
+                logger.warning("[TTS] Gemini TTS requer exatamente 2 speakers, ajustando de %s para 2", len(speaker_configs))
+                speaker_configs = speaker_configs[:MAX_SPEAKERS_PER_REQUEST]
+            elif len(speaker_configs) < MAX_SPEAKERS_PER_REQUEST:
+                # Pad with unused speakers (e.g. a run where only one host talks)
+                default_voices = get_default_voice_configs(MAX_SPEAKERS_PER_REQUEST)
+                used = {s.speaker for s in speaker_configs}
+                spare_names = [
+                    f"Speaker {n}" for n in range(1, MAX_SPEAKERS_PER_REQUEST + len(used) + 1)
+                    if f"Speaker {n}" not in used
+                ]
+                while len(speaker_configs) < MAX_SPEAKERS_PER_REQUEST:
+                    idx = len(speaker_configs)
+                    speaker_configs.append(
+                        _speaker_voice_config(spare_names.pop(0), default_voices[idx].vozId)
+                    )
             
             # Build prompt with explicit speaker instructions
+            first_speaker, second_speaker = (s.speaker for s in speaker_configs)
             tts_prompt = f"""TTS Instructions: This is a multi-speaker podcast dialogue. 
-Use different voices for Speaker 1 and Speaker 2 as configured.
-Read aloud naturally, respecting the dialogue format where each line starts with "Speaker 1:" or "Speaker 2:".
+Use different voices for {first_speaker} and {second_speaker} as configured.
+Read aloud naturally, respecting the dialogue format where each line starts with "{first_speaker}:" or "{second_speaker}:".
 
 Podcast Script:
 {script}"""
@@ -123,50 +357,45 @@ Podcast Script:
 
             logger.debug("[TTS] Iniciando streaming de áudio do Gemini...")
             
-            # Collect all audio chunks
-            audio_chunks = []
             chunk_count = 0
+            total_bytes = 0
             
-            for chunk in self.client.models.generate_content_stream(
+            # Native async stream: no worker thread held for the whole synthesis
+            stream = await self.client.aio.models.generate_content_stream(
                 model=settings.TTS_MODEL,
                 contents=contents,
                 config=generate_content_config,
-            ):
+            )
+            async for chunk in stream:
                 if (
                     chunk.candidates is None
                     or chunk.candidates[0].content is None
                     or chunk.candidates[0].content.parts is None
                 ):
-                    logger.debug(f"[TTS] Chunk {chunk_count} vazio, pulando...")
+                    if debug:
+                        logger.debug("[TTS] Chunk %d vazio, pulando...", chunk_count)
                     continue
                     
                 part = chunk.candidates[0].content.parts[0]
                 if part.inline_data and part.inline_data.data:
                     inline_data = part.inline_data
-                    data_buffer = inline_data.data
-                    
-                    # Convert to WAV if necessary
-                    file_extension = mimetypes.guess_extension(inline_data.mime_type)
-                    if file_extension is None:
-                        data_buffer = convert_to_wav(inline_data.data, inline_data.mime_type)
                     
-                    audio_chunks.append(data_buffer)
                     chunk_count += 1
-                    logger.debug(f"[TTS] Chunk {chunk_count} recebido, tamanho: {len(data_buffer)} bytes")
+                    total_bytes += len(inline_data.data)
+                    if debug:
+                        logger.debug("[TTS] Chunk %d recebido, tamanho: %d bytes", chunk_count, len(inline_data.data))
+                    yield inline_data.data, inline_data.mime_type
             
-            if not audio_chunks:
+            if not chunk_count:
                 logger.error("[TTS] Nenhum chunk de áudio recebido!")
                 raise HTTPException(status_code=500, detail="Falha ao gerar áudio do podcast")
             
-            # Combine all chunks (first one already has WAV header)
-            total_audio = b"".join(audio_chunks)
-            logger.info(f"[TTS] Áudio gerado com sucesso! Total: {len(total_audio)} bytes, {chunk_count} chunks")
-            return total_audio
+            logger.info("[TTS] Áudio gerado com sucesso! Total: %s bytes, %s chunks", total_bytes, chunk_count)
             
         except HTTPException:
             raise
         except Exception as e:
-            logger.exception(f"[TTS] Erro ao gerar áudio: {e}")
+            logger.exception("[TTS] Erro ao gerar áudio: %s", e)
             raise HTTPException(status_code=500, detail=f"Erro ao gerar áudio: {str(e)}")
 
 
@@ -1,8 +1,31 @@
 """
-Audio processing utilities for WAV file generation.
+Audio processing utilities for WAV file generation and compressed encoding.
 """
 
+import re
 import struct
+from functools import lru_cache
+from typing import Optional
+
+# PyAV is optional: without it every response falls back to WAV
+try:
+    import av
+    AUDIO_ENCODING_AVAILABLE = True
+except ImportError:
+    av = None
+    AUDIO_ENCODING_AVAILABLE = False
+
+# Output formats: name -> (MIME type, file extension)
+AUDIO_FORMATS = {
+    "wav": ("audio/wav", "wav"),
+    "flac": ("audio/flac", "flac"),
+    "opus": ("audio/ogg", "opus"),
+}
+
+
+# "audio/L16;rate=24000": sample size in the subtype, rate as a parameter (any order)
+_MIME_BITS_RE = re.compile(r"audio/L(\d+)")
+_MIME_RATE_RE = re.compile(r"(?:^|;)\s*rate=(\d+)", re.IGNORECASE)
 
 
 def parse_audio_mime_type(mime_type: str) -> dict[str, int]:
@@ -15,50 +38,51 @@ def parse_audio_mime_type(mime_type: str) -> dict[str, int]:
     Returns:
         Dict with "bits_per_sample" and "rate"
     """
-    bits_per_sample = 16
-    rate = 24000
-
-    parts = mime_type.split(";")
-    for param in parts:
-        param = param.strip()
-        if param.lower().startswith("rate="):
-            try:
-                rate_str = param.split("=", 1)[1]
-                rate = int(rate_str)
-            except (ValueError, IndexError):
-                pass
-        elif param.startswith("audio/L"):
-            try:
-                bits_per_sample = int(param.split("L", 1)[1])
-            except (ValueError, IndexError):
-                pass
+    bits_match = _MIME_BITS_RE.search(mime_type)
+    rate_match = _MIME_RATE_RE.search(mime_type)
+    bits_per_sample = int(bits_match.group(1)) if bits_match else 16
+    rate = int(rate_match.group(1)) if rate_match else 24000
 
     return {"bits_per_sample": bits_per_sample, "rate": rate}
 
 
-def convert_to_wav(audio_data: bytes, mime_type: str) -> bytes:
+# RIFF header of a PCM WAV file: RIFF chunk, 16-byte fmt chunk, data chunk header
+_WAV_HEADER = struct.Struct("<4sI4s4sIHHIIHH4sI")
+WAV_HEADER_SIZE = _WAV_HEADER.size
+
+# Size field value for WAV streamed before its length is known
+WAV_UNKNOWN_SIZE = 0xFFFFFFFF
+
+
+@lru_cache(maxsize=32)
+def build_wav_header(
+    data_size: Optional[int],
+    sample_rate: int,
+    bits_per_sample: int = 16,
+    num_channels: int = 1,
+) -> bytes:
     """
-    Generates WAV header and combines with raw audio data.
+    Builds the 44-byte header of a PCM WAV file.
+    
+    Cached: a process sees only a few (rate, bits) pairs, and streamed
+    podcasts all share the same unknown-size header.
     
     Args:
-        audio_data: Raw audio data
-        mime_type: Audio MIME type
+        data_size: Size of the PCM data in bytes, or None when streaming
+            (sizes are then set to WAV_UNKNOWN_SIZE, see finalize_wav_header)
+        sample_rate: Sample rate in Hz
+        bits_per_sample: Bits per sample
+        num_channels: Number of channels
         
     Returns:
-        Complete WAV file in bytes
+        WAV header in bytes
     """
-    parameters = parse_audio_mime_type(mime_type)
-    bits_per_sample = parameters["bits_per_sample"]
-    sample_rate = parameters["rate"]
-    num_channels = 1
-    data_size = len(audio_data)
-    bytes_per_sample = bits_per_sample // 8
-    block_align = num_channels * bytes_per_sample
-    byte_rate = sample_rate * block_align
-    chunk_size = 36 + data_size
-
-    header = struct.pack(
-        "<4sI4s4sIHHIIHH4sI",
+    block_align = num_channels * (bits_per_sample // 8)
+    if data_size is None:
+        chunk_size = data_size = WAV_UNKNOWN_SIZE
+    else:
+        chunk_size = 36 + data_size
+    return _WAV_HEADER.pack(
         b"RIFF",
         chunk_size,
         b"WAVE",
@@ -67,10 +91,101 @@ def convert_to_wav(audio_data: bytes, mime_type: str) -> bytes:
         1,
         num_channels,
         sample_rate,
-        byte_rate,
+        sample_rate * block_align,
         block_align,
         bits_per_sample,
         b"data",
-        data_size
+        data_size,
     )
-    return header + audio_data
+
+
+def finalize_wav_header(wav: bytearray) -> None:
+    """
+    Writes the real sizes into a WAV built from a streaming header, in place.
+    
+    Args:
+        wav: Complete WAV file; left untouched if it isn't a 44-byte-header WAV
+    """
+    if len(wav) < WAV_HEADER_SIZE or wav[:4] != b"RIFF" or wav[36:40] != b"data":
+        return
+    struct.pack_into("<I", wav, 4, min(len(wav) - 8, WAV_UNKNOWN_SIZE))
+    struct.pack_into("<I", wav, 40, min(len(wav) - WAV_HEADER_SIZE, WAV_UNKNOWN_SIZE))
+
+
+class _ChunkSink:
+    """Write-only file object: without seek(), muxers never rewrite earlier bytes."""
+    
+    def __init__(self):
+        self._parts: list[bytes] = []
+    
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+    
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+class AudioEncoder:
+    """
+    Incremental encoder from 16-bit mono PCM to FLAC or Ogg/Opus (PyAV).
+    
+    Encoded bytes are returned as soon as the muxer writes them, so the
+    output can feed a streaming response.
+    """
+    
+    # format -> (container, codec)
+    _CODECS = {"flac": ("flac", "flac"), "opus": ("ogg", "libopus")}
+    
+    def __init__(self, audio_format: str, sample_rate: int, bit_rate: int = 24000):
+        """
+        Args:
+            audio_format: "flac" or "opus"
+            sample_rate: Sample rate of the input PCM
+            bit_rate: Target bit rate in bits/s (Opus only, FLAC is lossless)
+        """
+        container_format, codec = self._CODECS[audio_format]
+        self._sample_rate = sample_rate
+        self._remainder = b""
+        self._sink = _ChunkSink()
+        self._container = av.open(self._sink, mode="w", format=container_format)
+        self._stream = self._container.add_stream(codec, rate=sample_rate)
+        self._stream.layout = "mono"
+        if audio_format == "opus":
+            self._stream.bit_rate = bit_rate
+    
+    def encode(self, pcm: bytes) -> bytes:
+        """
+        Encodes a chunk of little-endian 16-bit PCM.
+        
+        Returns:
+            Encoded bytes produced so far (may be empty while the codec buffers)
+        """
+        pcm = self._remainder + pcm
+        # Carry an odd trailing byte into the next chunk
+        usable = len(pcm) - len(pcm) % 2
+        self._remainder = pcm[usable:]
+        if usable:
+            frame = av.AudioFrame(format="s16", layout="mono", samples=usable // 2)
+            frame.planes[0].update(pcm[:usable])
+            frame.sample_rate = self._sample_rate
+            self._mux(self._stream.encode(frame))
+        return self._sink.drain()
+    
+    def finish(self) -> bytes:
+        """
+        Flushes the codec and closes the container.
+        
+        Returns:
+            The remaining encoded bytes
+        """
+        self._mux(self._stream.encode(None))
+        self._container.close()
+        return self._sink.drain()
+    
+    def _mux(self, packets) -> None:
+        for packet in packets:
+            self._container.mux(packet)
+
@@ -0,0 +1,112 @@
+"""
+In-process caching utilities.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Generic, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+def make_cache_key(*parts: object) -> str:
+    """
+    Builds a stable cache key from the given parts.
+
+    Args:
+        *parts: Values that identify the cached result
+
+    Returns:
+        SHA-256 hex digest of the parts joined by "|"
+    """
+    raw = "|".join(str(p) for p in parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTLCache(Generic[V]):
+    """
+    Bounded LRU cache whose entries expire after a fixed TTL.
+
+    Not thread-safe: meant to be used from the event loop.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict[str, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[V]:
+        """
+        Returns the cached value, or None if missing or expired.
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: V, ttl_seconds: Optional[float] = None) -> None:
+        """
+        Stores a value, evicting the least recently used entry when full.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl_seconds: Lifetime of this entry, instead of the cache's TTL
+        """
+        if self.maxsize <= 0 or self.ttl_seconds <= 0:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SingleFlight(Generic[V]):
+    """
+    Coalesces concurrent calls that share a key into a single in-flight call.
+
+    Followers await the leader's task instead of issuing their own request.
+    A cancelled waiter does not cancel the shared call for the others.
+    Not thread-safe: meant to be used from the event loop.
+    """
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Future[V]] = {}
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[V]]) -> V:
+        """
+        Awaits the in-flight call for key, starting it with factory if needed.
+
+        Args:
+            key: Identifies equivalent calls
+            factory: Creates the awaitable when no call is in flight
+
+        Returns:
+            The shared call's result (its exception is raised to every waiter)
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: asyncio.Future[V]) -> None:
+        self._inflight.pop(key, None)
+        # Mark the exception as retrieved when every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._inflight)
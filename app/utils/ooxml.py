@@ -0,0 +1,214 @@
+"""
+Plain-text extraction for Office Open XML documents (DOCX, XLSX, PPTX).
+
+These formats are ZIP archives of XML parts, so their text can be read with
+zipfile + ElementTree, without running Docling's layout pipeline.
+"""
+
+import posixpath
+import re
+import zipfile
+from typing import Callable, Iterator
+from xml.etree import ElementTree as ET
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+S_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+A_NS = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+P_NS = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+R_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# Word style IDs drop non-ASCII chars: "Título 1" is stored as "Ttulo1"
+_HEADING_RE = re.compile(r"(?:Heading|Ttulo|Titulo)(\d)", re.IGNORECASE)
+
+
+def _resolve_rels(zf: zipfile.ZipFile, part: str) -> dict[str, str]:
+    """
+    Maps relationship IDs of a part to the archive paths they point to.
+
+    Args:
+        zf: Open OOXML archive
+        part: Part whose relationships to read (e.g. "xl/workbook.xml")
+
+    Returns:
+        Dict of relationship ID -> archive path
+    """
+    base_dir, name = posixpath.split(part)
+    rels_path = posixpath.join(base_dir, "_rels", f"{name}.rels")
+    root = ET.fromstring(zf.read(rels_path))
+    rels = {}
+    for rel in root.iter(f"{PKG_REL_NS}Relationship"):
+        target = rel.get("Target", "")
+        if target.startswith("/"):
+            path = target.lstrip("/")
+        else:
+            path = posixpath.normpath(posixpath.join(base_dir, target))
+        rels[rel.get("Id")] = path
+    return rels
+
+
+def _iter_paragraph_text(source, tag: str, text_tag: str) -> Iterator[tuple[ET.Element, str]]:
+    """Streams paragraphs of an XML part, yielding each with its joined text."""
+    for _, elem in ET.iterparse(source, events=("end",)):
+        if elem.tag == tag:
+            yield elem, "".join(t.text or "" for t in elem.iter(text_tag))
+            elem.clear()
+
+
+def extract_docx(zf: zipfile.ZipFile) -> str:
+    """
+    Extracts DOCX body text as Markdown-ish lines, keeping headings.
+
+    Args:
+        zf: Open DOCX archive
+
+    Returns:
+        Extracted text
+    """
+    lines = []
+    with zf.open("word/document.xml") as source:
+        for paragraph, text in _iter_paragraph_text(source, f"{W_NS}p", f"{W_NS}t"):
+            if not text.strip():
+                continue
+            style = paragraph.find(f"{W_NS}pPr/{W_NS}pStyle")
+            match = _HEADING_RE.search(style.get(f"{W_NS}val", "")) if style is not None else None
+            if match:
+                text = f"{'#' * int(match.group(1))} {text}"
+            lines.append(text)
+    return "\n\n".join(lines)
+
+
+def extract_xlsx(zf: zipfile.ZipFile) -> str:
+    """
+    Extracts every XLSX worksheet as a Markdown table, in workbook order.
+
+    Args:
+        zf: Open XLSX archive
+
+    Returns:
+        Extracted text
+    """
+    shared_strings: list[str] = []
+    if "xl/sharedStrings.xml" in zf.namelist():
+        with zf.open("xl/sharedStrings.xml") as source:
+            shared_strings = [text for _, text in _iter_paragraph_text(source, f"{S_NS}si", f"{S_NS}t")]
+
+    rels = _resolve_rels(zf, "xl/workbook.xml")
+    workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+
+    sections = []
+    for sheet in workbook.iter(f"{S_NS}sheet"):
+        sheet_path = rels.get(sheet.get(f"{R_NS}id"))
+        if sheet_path is None:
+            continue
+        rows: list[list[str]] = []
+        with zf.open(sheet_path) as source:
+            for _, row in ET.iterparse(source, events=("end",)):
+                if row.tag != f"{S_NS}row":
+                    continue
+                cells = _row_cells(row, shared_strings)
+                if any(cells):
+                    rows.append(cells)
+                row.clear()
+        if rows:
+            # Every row gets the width of the widest one; the first becomes the header
+            width = max(len(cells) for cells in rows)
+            lines = ["| " + " | ".join(cells + [""] * (width - len(cells))) + " |" for cells in rows]
+            lines.insert(1, "|" + "---|" * width)
+            sections.append(f"## {sheet.get('name', '')}\n\n" + "\n".join(lines))
+    return "\n\n".join(sections)
+
+
+def _column_index(reference: str) -> int:
+    """Zero-based column of a cell reference such as "C2" (-1 if it has none)."""
+    index = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - ord("A") + 1
+    return index - 1
+
+
+def _row_cells(row: ET.Element, shared_strings: list[str]) -> list[str]:
+    """
+    Texts of a worksheet row, placed at their column.
+
+    Excel omits empty cells from the XML, so each cell's r= reference decides
+    its position and the gaps are filled with "". Cells without a reference
+    follow the previous one.
+    """
+    cells: list[str] = []
+    for cell in row.iter(f"{S_NS}c"):
+        index = _column_index(cell.get("r", ""))
+        if index < len(cells):
+            index = len(cells)
+        cells.extend([""] * (index - len(cells)))
+        cells.append(_cell_text(cell, shared_strings))
+    return cells
+
+
+def _cell_text(cell: ET.Element, shared_strings: list[str]) -> str:
+    """Resolves the display text of a worksheet cell."""
+    cell_type = cell.get("t")
+    if cell_type == "inlineStr":
+        return "".join(t.text or "" for t in cell.iter(f"{S_NS}t")).replace("|", "\\|")
+    value = cell.findtext(f"{S_NS}v") or ""
+    if cell_type == "s" and value:
+        try:
+            value = shared_strings[int(value)]
+        except (ValueError, IndexError):
+            return ""
+    return value.replace("|", "\\|")
+
+
+def extract_pptx(zf: zipfile.ZipFile) -> str:
+    """
+    Extracts PPTX slide text, in presentation order.
+
+    Args:
+        zf: Open PPTX archive
+
+    Returns:
+        Extracted text
+    """
+    rels = _resolve_rels(zf, "ppt/presentation.xml")
+    presentation = ET.fromstring(zf.read("ppt/presentation.xml"))
+
+    sections = []
+    for number, slide_id in enumerate(presentation.iter(f"{P_NS}sldId"), start=1):
+        slide_path = rels.get(slide_id.get(f"{R_NS}id"))
+        if slide_path is None:
+            continue
+        with zf.open(slide_path) as source:
+            lines = [
+                text for _, text in _iter_paragraph_text(source, f"{A_NS}p", f"{A_NS}t")
+                if text.strip()
+            ]
+        if lines:
+            sections.append(f"## Slide {number}\n\n" + "\n".join(lines))
+    return "\n\n".join(sections)
+
+
+OOXML_EXTRACTORS: dict[str, Callable[[zipfile.ZipFile], str]] = {
+    ".docx": extract_docx,
+    ".xlsx": extract_xlsx,
+    ".pptx": extract_pptx,
+}
+
+
+def extract_ooxml_text(path: str, extension: str) -> str:
+    """
+    Extracts text from a DOCX, XLSX or PPTX file.
+
+    Args:
+        path: Path to the document
+        extension: Lowercase file extension, one of OOXML_EXTRACTORS
+
+    Returns:
+        Extracted text
+
+    Raises:
+        zipfile.BadZipFile, KeyError, ET.ParseError: If the file is not a valid package
+    """
+    with zipfile.ZipFile(path) as zf:
+        return OOXML_EXTRACTORS[extension](zf)
@@ -0,0 +1,68 @@
+"""
+Request bodies accepted either as JSON or as form data.
+"""
+
+from typing import Awaitable, Callable, TypeVar
+
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+
+M = TypeVar("M", bound=BaseModel)
+
+_FORM_CONTENT_TYPES = ("application/x-www-form-urlencoded", "multipart/form-data")
+
+
+def json_or_form(model: type[M]) -> Callable[[Request], Awaitable[M]]:
+    """
+    Builds a dependency that parses the request body into model.
+
+    JSON bodies are validated straight from the raw bytes by pydantic-core,
+    without the multipart parser; form submissions from existing clients
+    keep working. Any other content type is read as JSON.
+
+    Args:
+        model: Pydantic model describing the body
+
+    Returns:
+        Dependency for Depends() returning the validated model
+
+    Raises:
+        RequestValidationError: If the body does not match the model (422)
+    """
+    async def parse_body(request: Request) -> M:
+        content_type = request.headers.get("content-type", "")
+        try:
+            if content_type.startswith(_FORM_CONTENT_TYPES):
+                form = await request.form()
+                return model.model_validate(dict(form))
+            return model.model_validate_json(await request.body())
+        except ValidationError as e:
+            # Same shape as FastAPI's own body errors
+            raise RequestValidationError(
+                [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+            )
+
+    return parse_body
+
+
+def json_or_form_openapi(model: type[BaseModel]) -> dict:
+    """
+    OpenAPI request body for a route using json_or_form(model).
+
+    Args:
+        model: Pydantic model describing the body (without nested models)
+
+    Returns:
+        Dict for the route's openapi_extra
+    """
+    schema = model.model_json_schema()
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                content_type: {"schema": schema}
+                for content_type in ("application/json", *_FORM_CONTENT_TYPES)
+            },
+        }
+    }
@@ -7,12 +7,22 @@ Main entry point for the Podcast Generator API.
 Run with:
     uv run python -m uvicorn main:app --host 0.0.0.0 --port 8000 --reload
 
-Or simply:
+Or simply (no reload; PORT and WEB_CONCURRENCY come from settings, env or .env):
     python main.py
 """
 
+from app.core.config import settings
 from app.main import app
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=settings.PORT,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        # Each worker loads its own Docling models, size it to the instance memory
+        workers=settings.WEB_CONCURRENCY,
+    )
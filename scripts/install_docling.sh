@@ -18,8 +18,8 @@ echo "=========================================="
 echo "Installing Docling..."
 echo "=========================================="
 
-# Install Docling
-pip install --no-cache-dir docling
+# Install Docling, plus hf_transfer for faster model downloads
+pip install --no-cache-dir docling hf_transfer
 
 echo "=========================================="
 echo "Installation complete!"
@@ -0,0 +1,17 @@
+-- Covering index for GET /podcast/list (filter by user_id, newest first).
+--
+-- create_all only creates missing indexes, so databases created before this
+-- index was widened need this script. CONCURRENTLY avoids locking writes; run
+-- it outside a transaction (e.g. psql -f), not through pgbouncer.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_podcasts_user_created_new
+    ON podcasts (user_id, created_at DESC)
+    INCLUDE (id, title, theme, duration_minutes, audio_url, audio_path);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_podcasts_user_created;
+
+ALTER INDEX idx_podcasts_user_created_new RENAME TO idx_podcasts_user_created;
+
+-- count_by_user is served by ix_podcasts_user_id (user_id, index=True) or by
+-- the leading column of the index above; create it if the table predates it.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_podcasts_user_id ON podcasts (user_id);
@@ -0,0 +1,82 @@
+"""
+Tests for the OOXML text extractors.
+"""
+
+import io
+import unittest
+import zipfile
+
+from app.utils.ooxml import extract_xlsx
+
+_WORKBOOK = """<?xml version="1.0" encoding="UTF-8"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+          xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+  <sheets><sheet name="Pessoas" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+  <Relationship Id="rId1" Target="worksheets/sheet1.xml"
+                Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>
+</Relationships>"""
+
+
+def _xlsx(rows: str) -> zipfile.ZipFile:
+    """Builds an in-memory workbook with one sheet holding the given <row> elements."""
+    sheet = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        f"<sheetData>{rows}</sheetData></worksheet>"
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("xl/workbook.xml", _WORKBOOK)
+        zf.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        zf.writestr("xl/worksheets/sheet1.xml", sheet)
+    return zipfile.ZipFile(buffer)
+
+
+def _cell(ref: str, text: str) -> str:
+    return f'<c r="{ref}" t="inlineStr"><is><t>{text}</t></is></c>'
+
+
+class ExtractXlsxTest(unittest.TestCase):
+
+    def test_dense_sheet(self):
+        zf = _xlsx(
+            f'<row r="1">{_cell("A1", "Nome")}{_cell("B1", "Idade")}</row>'
+            f'<row r="2">{_cell("A2", "Ana")}<c r="B2"><v>30</v></c></row>'
+        )
+        self.assertEqual(
+            extract_xlsx(zf),
+            "## Pessoas\n\n| Nome | Idade |\n|---|---|\n| Ana | 30 |",
+        )
+
+    def test_sparse_cells_keep_their_column(self):
+        # Excel omits empty cells: B2 is missing, C2 must stay under "UF"
+        zf = _xlsx(
+            f'<row r="1">{_cell("A1", "Nome")}{_cell("B1", "Idade")}{_cell("C1", "UF")}</row>'
+            f'<row r="2">{_cell("A2", "Ana")}{_cell("C2", "SP")}</row>'
+        )
+        self.assertEqual(
+            extract_xlsx(zf),
+            "## Pessoas\n\n| Nome | Idade | UF |\n|---|---|---|\n| Ana |  | SP |",
+        )
+
+    def test_rows_are_padded_to_the_widest_row(self):
+        zf = _xlsx(
+            f'<row r="1">{_cell("A1", "Nome")}</row>'
+            f'<row r="2">{_cell("A2", "Ana")}{_cell("D2", "x")}</row>'
+        )
+        self.assertEqual(
+            extract_xlsx(zf),
+            "## Pessoas\n\n| Nome |  |  |  |\n|---|---|---|---|\n| Ana |  |  | x |",
+        )
+
+    def test_cells_without_reference_follow_the_previous_one(self):
+        zf = _xlsx('<row><c t="inlineStr"><is><t>a</t></is></c><c t="inlineStr"><is><t>b</t></is></c></row>')
+        self.assertEqual(extract_xlsx(zf), "## Pessoas\n\n| a | b |\n|---|---|")
+
+
+if __name__ == "__main__":
+    unittest.main()